@@ -1,11 +1,22 @@
+import asyncio
 import logging
 from datetime import datetime
 from json import load
 from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
 
 from aiohttp import ClientSession
-from discord import Game
-from discord.ext.commands import Bot
+from discord import Game, TextChannel
+from discord.ext.commands import Bot, Cog, Context
+
+from .utils.channel_router import ChannelRouter
+from .utils.file_writer import BackgroundWriter
+from .utils.http import HTTPClient
+from .utils.logs import setup_logging
+from .utils.metrics import Metrics
+from .utils.scheduler import Scheduler
+from .utils.watchdog import LoopWatchdog, Stall
 
 
 with open("conf.json") as f:
@@ -14,24 +25,7 @@ with open("conf.json") as f:
 BOT_TOKEN = conf["BOT_TOKEN"]
 
 logger = logging.getLogger("bot")
-logger.setLevel(logging.DEBUG)
-
-formatter = logging.Formatter('{asctime} - {name} - {levelname} - {message}', style='{')
-
-console_logging = logging.StreamHandler()
-console_logging.setFormatter(formatter)
-
-now = datetime.now().replace(microsecond=0).timestamp()
-
-log_file = Path("logs", f"logging{str(now)}.txt")
-
-log_file.parent.mkdir(exist_ok=True)
-
-file_logging = logging.FileHandler(log_file)
-file_logging.setFormatter(formatter)
-
-logger.addHandler(console_logging)
-logger.addHandler(file_logging)
+log_listener = setup_logging(logger, conf, Path("logs", "bot.log"))
 
 # Silence most of discord logs.
 
@@ -40,12 +34,28 @@ logging.getLogger('aiosqlite').setLevel(logging.ERROR)
 logging.getLogger('websockets').setLevel(logging.ERROR)
 
 
+DEFAULT_EXTENSIONS: list = [
+    "ynb-bot.cogs.clean",
+    "ynb-bot.cogs.server_info",
+    "ynb-bot.cogs.error_handler",
+    "ynb-bot.cogs.lichess_api",
+    "ynb-bot.cogs.chess_com_api",
+    "ynb-bot.cogs.admin_cmds",
+    "ynb-bot.cogs.clock_channel",
+    "ynb-bot.cogs.events",
+    "ynb-bot.cogs.recruit"
+]
+
+
 class YnbBot(Bot):
     """An instance of the `discord.ext.commands.bot`."""
 
     def __init__(self, *args, **kwargs):
         self.conf = conf
-        self.http_session = ClientSession()
+        self.metrics = Metrics()
+        self.http_client = HTTPClient(conf.get("HTTP"), self.metrics)
+        self.router = ChannelRouter()
+        self.file_writer = BackgroundWriter()
         super().__init__(
             command_prefix=".",
             case_insensitive=True,
@@ -53,26 +63,177 @@ class YnbBot(Bot):
             *args,
             **kwargs
         )
+        self.add_listener(self.router.dispatch, "on_message")
+        self.add_listener(self.count_gateway_event, "on_socket_response")
+        self.before_invoke(self.start_command_timer)
+        self.after_invoke(self.stop_command_timer)
+        self.scheduler = Scheduler(self.loop, self.metrics)
+        self.watchdog: Optional[LoopWatchdog] = None
+        self.initialized = False
+        self.extension_mtimes: Dict[str, float] = {}
+
+    @property
+    def http_session(self) -> ClientSession:
+        """The aiohttp session shared by every cog."""
+        return self.http_client.session
+
+    async def close(self) -> None:
+        """Cancel background jobs, log out and close the shared HTTP session."""
+        self.scheduler.stop()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        await super().close()
+        await self.http_client.close()
+        await self.metrics.stop_server()
+        self.file_writer.close()
+
+    async def count_gateway_event(self, payload: dict) -> None:
+        self.metrics.observe_event(payload.get("t") or f"OP_{payload.get('op')}")
+
+    async def start_command_timer(self, ctx: Context) -> None:
+        ctx.started_at = perf_counter()
+
+    async def stop_command_timer(self, ctx: Context) -> None:
+        self.metrics.observe_command(
+            ctx.command.qualified_name, perf_counter() - ctx.started_at, ctx.command_failed
+        )
+
+    def reload_conf(self) -> None:
+        """Read conf.json again and let cogs rebuild what depends on it."""
+        with open("conf.json") as f:
+            self.conf = load(f)
+        logger.info("Config reloaded.")
+        self.dispatch("conf_reload")
+
+    def load_extensions(self) -> None:
+        """Load the extensions listed in `EXTENSIONS`, logging the time each one takes."""
+        logger.info("Loading cogs...")
+        for extension in self.conf.get("EXTENSIONS", DEFAULT_EXTENSIONS):
+            start: float = perf_counter()
+            self.load_extension(extension)
+            logger.info(f"{extension}: loaded in {(perf_counter() - start) * 1000:.0f}ms")
+        logger.info("Loading cogs... DONE\n")
+
+    async def initialize_cog(self, name: str, cog: Cog) -> None:
+        """Run the `async_init` hook of a cog, logging its time."""
+        start: float = perf_counter()
+        try:
+            await cog.async_init()
+        except Exception:
+            logger.exception(f"{name}: async init failed.")
+        else:
+            logger.info(f"{name}: async init {(perf_counter() - start) * 1000:.0f}ms")
+
+    async def reload_cog_extension(self, extension: str) -> None:
+        """
+        Reload one extension, handing state from the old cogs to the new ones.
+
+        Before unloading, `snapshot_state()` is called on each of the extension's cogs
+        that defines it. The new cog with the same name gets the result through
+        `restore_state(state)` before its `async_init` restarts its background work.
+
+        If the new version fails to load, discord.py sets the old module up again and
+        re-raises. The old cogs then get their state back and are restarted the same
+        way before the error is raised. The file is not retried until it changes again.
+        """
+        snapshots: dict = {
+            name: cog.snapshot_state()
+            for name, cog in self.cogs.items() if cog.__module__ == extension and hasattr(cog, "snapshot_state")
+        }
+
+        start: float = perf_counter()
+        try:
+            self.reload_extension(extension)
+        except Exception:
+            if extension in self.extensions:
+                self.extension_mtimes[extension] = self.get_extension_mtime(extension)
+                await self.restore_cogs(extension, snapshots)
+            raise
+        self.extension_mtimes[extension] = self.get_extension_mtime(extension)
+        await self.restore_cogs(extension, snapshots)
+        logger.info(f"{extension} reloaded in {(perf_counter() - start) * 1000:.0f}ms.")
+
+    async def restore_cogs(self, extension: str, snapshots: dict) -> None:
+        """Hand the snapshots to the extension's new cogs and run their `async_init`."""
+        for name, cog in self.cogs.items():
+            if cog.__module__ != extension:
+                continue
+            if name in snapshots and hasattr(cog, "restore_state"):
+                cog.restore_state(snapshots[name])
+            if self.initialized and hasattr(cog, "async_init"):
+                await self.initialize_cog(name, cog)
+
+    def get_extension_mtime(self, extension: str) -> float:
+        return Path(self.extensions[extension].__file__).stat().st_mtime
+
+    async def watch_extensions(self) -> None:
+        """Reload the extensions whose source file changed since they were loaded."""
+        for extension in list(self.extensions):
+            mtime: float = self.get_extension_mtime(extension)
+            if mtime != self.extension_mtimes.setdefault(extension, mtime):
+                logger.info(f"{extension} changed, reloading.")
+                await self.reload_cog_extension(extension)
+
+    async def report_stalls(self) -> None:
+        """Log the worst event loop stalls since the last report and post them to the stats channel."""
+        stalls: List[Stall] = self.watchdog.pop_report()
+        if not stalls:
+            return
+
+        for stall in stalls:
+            logger.warning(
+                f"Event loop blocked {stall.count} times at {stall.location}, "
+                f"worst {stall.worst * 1000:.0f}ms, total {stall.total * 1000:.0f}ms:\n{stall.stack}"
+            )
+
+        channel: TextChannel = self.get_channel(self.conf["BOT_STATS_ID"])
+        if channel is None:
+            return
+        msg: str = "```Event loop stalls\n\n"
+        for stall in stalls:
+            entry: str = f"{stall.location}: {stall.count}x, worst {stall.worst * 1000:.0f}ms\n" \
+                         f"{stall.stack[-600:]}\n"
+            if len(msg) + len(entry) > 1990:
+                break
+            msg += entry
+        msg += "```"
+        await channel.send(msg)
+
+    async def start(self, *args, **kwargs) -> None:
+        """Load the extensions before connecting to the gateway."""
+        self.load_extensions()
+        self.scheduler.add_job("loop-lag", self.metrics.sample_loop_lag)
+        if self.conf.get("METRICS_PORT"):
+            await self.metrics.start_server(self.conf.get("METRICS_HOST", "127.0.0.1"), self.conf["METRICS_PORT"])
+        if self.conf.get("LOOP_WATCHDOG_THRESHOLD"):
+            self.watchdog = LoopWatchdog(self.conf["LOOP_WATCHDOG_THRESHOLD"])
+            self.watchdog.start()
+            self.scheduler.add_job("loop-watchdog", self.watchdog.heartbeat)
+            self.scheduler.add_job(
+                "loop-watchdog-report", self.report_stalls, every=self.conf.get("LOOP_WATCHDOG_REPORT_INTERVAL", 600)
+            )
+        if self.conf.get("HOT_RELOAD_WATCH", False):
+            self.scheduler.add_job("hot-reload-watch", self.watch_extensions, every=2)
+        await super().start(*args, **kwargs)
 
     async def on_ready(self):
         """Invoke when bot is ready."""
         logger.info(f"Bot Logged in as: {self.user.name}")
         logger.info(f"Starting Time: {datetime.now()}\n")
-        logger.info("Loading cogs...")
 
-        self.load_extension("ynb-bot.cogs.clean")
-        self.load_extension("ynb-bot.cogs.server_info")
-        self.load_extension("ynb-bot.cogs.error_handler")
-        self.load_extension("ynb-bot.cogs.lichess_api")
-        self.load_extension("ynb-bot.cogs.admin_cmds")
-        self.load_extension("ynb-bot.cogs.clock_channel")
-        self.load_extension("ynb-bot.cogs.events")
-        self.load_extension("ynb-bot.cogs.recruit")
+        # on_ready fires again after every reconnect, the cogs only need initializing once.
+        if not self.initialized:
+            self.initialized = True
+            await asyncio.gather(*(
+                self.initialize_cog(name, cog) for name, cog in self.cogs.items() if hasattr(cog, "async_init")
+            ))
 
-        logger.info("Loading cogs... DONE\n")
         await self.change_presence(activity=Game(name="You Need Beer!"))
 
 
 if __name__ == "__main__":
     bot = YnbBot()
-    bot.run(BOT_TOKEN)
+    try:
+        bot.run(BOT_TOKEN)
+    finally:
+        log_listener.stop()
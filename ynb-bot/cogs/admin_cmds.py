@@ -1,8 +1,14 @@
 import logging
 from datetime import datetime, timedelta
+from pathlib import Path
+from time import monotonic
 
 from discord import TextChannel, Guild, Role
-from discord.ext.commands import Cog, Bot, command, has_role
+from discord.ext.commands import Cog, Bot, command, has_role, is_owner
+
+from ..utils.metrics import Histogram, Metrics
+from ..utils.paginator import LazyPaginator
+from ..utils.role_assigner import BulkRoleAssigner, BulkRoleResult
 
 
 logger = logging.getLogger("bot." + __name__)
@@ -12,41 +18,135 @@ class AdminCmds(Cog):
     """Admin commands."""
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.role_assigner = BulkRoleAssigner(
+            Path("ynb-bot", "resources", "role_jobs"),
+            bot.file_writer,
+            concurrency=bot.conf.get("ROLE_ASSIGN_CONCURRENCY", 5)
+        )
 
     @command(name="update-verified")
     @has_role(554485497192513540)
-    async def assing_verified_role(self, ctx):
-        """Assign the verified role to members who have been on the server for more than 30 days."""
-        reporting_channel: TextChannel = await self.bot.fetch_channel(self.bot.conf["BOT_STATS_ID"])
+    async def assing_verified_role(self, ctx, mode: str = None):
+        """
+        Assign the verified role to members who have been on the server for more than 30 days.
+
+        Use `.update-verified dry-run` to list the members without giving the role.
+        An interrupted run is resumed by running the command again.
+        """
+        dry_run: bool = mode == "dry-run"
+        reporting_channel: TextChannel = self.bot.get_channel(self.bot.conf["BOT_STATS_ID"])
         smp_role_id: int = 489176009120415744
         verified_role_id: int = 705274433723564083
-        nverfied_members: list = []
         guild: Guild = ctx.guild
-        all_members: list = guild.members
-        for member in all_members:
-            member_join_date: datetime = member.joined_at
-            today: datetime = datetime.now()
-            days_present: timedelta = today - member_join_date
-
-            roles_id: list = [role.id for role in member.roles]
-
-            if verified_role_id in roles_id:
-                continue
-
-            if smp_role_id in roles_id:
-                if days_present.days > 29:
-                    verified_role: Role = guild.get_role(verified_role_id)
-                    await member.add_roles(verified_role)
-                    logger.info(f"{str(member)} is given the {verified_role.name} role.")
-                    nverfied_members.append(str(member))
-                else:
-                    pass
-
-        msg: str = f"```**{len(nverfied_members)} members have been given the verified role.**\n\n"
-        for m in nverfied_members:
-            msg += f"{m}\n"
+        verified_role: Role = guild.get_role(verified_role_id)
+
+        eligible: list = self.role_assigner.eligible_members(
+            guild.members,
+            required_role_ids={smp_role_id},
+            excluded_role_ids={verified_role_id},
+            joined_before=datetime.utcnow() - timedelta(days=30)
+        )
+        result: BulkRoleResult = await self.role_assigner.run(
+            "update-verified", verified_role, eligible, ctx.channel, dry_run=dry_run, reason="Member for 30 days."
+        )
+
+        action: str = "would be given" if result.dry_run else "have been given"
+        paginator: LazyPaginator = LazyPaginator(
+            f"**{len(result.assigned)} members {action} the verified role.**", result.assigned
+        )
+        await paginator.start(self.bot, reporting_channel, ctx.author)
+        if result.failed:
+            failed_paginator: LazyPaginator = LazyPaginator(
+                f"**Failed to give the verified role to {len(result.failed)} members.**", result.failed
+            )
+            await failed_paginator.start(self.bot, reporting_channel, ctx.author)
+
+    @command(name="jobs")
+    @has_role(554485497192513540)
+    async def list_jobs(self, ctx) -> None:
+        """Display the background jobs with their next run, last duration and failures."""
+        now: datetime = datetime.utcnow()
+        msg: str = "```Background jobs (UTC)\n\n"
+        for job in self.bot.scheduler.jobs.values():
+            if job.next_run is None:
+                next_run: str = "running" if job.running else "stopped"
+            else:
+                next_run = f"{job.next_run:%Y-%m-%d %H:%M:%S} (in {max(0, (job.next_run - now).total_seconds()):.0f}s)"
+            duration: str = "-" if job.last_duration is None else f"{job.last_duration:.2f}s"
+            msg += f"{job.name}\n" \
+                   f"  Next run: {next_run}\n" \
+                   f"  Last duration: {duration}\n" \
+                   f"  Runs: {job.runs}, Failures: {job.failures}\n"
+            if job.last_error:
+                msg += f"  Last error: {job.last_error[:100]}\n"
         msg += "```"
-        await reporting_channel.send(msg)
+        await ctx.send(msg)
+
+    @command(name="stats")
+    @has_role(554485497192513540)
+    async def show_stats(self, ctx) -> None:
+        """Display command and HTTP latencies, gateway events, job durations and event loop lag."""
+        metrics: Metrics = self.bot.metrics
+        lag: Histogram = metrics.loop_lag
+        rows: list = [
+            f"Uptime: {timedelta(seconds=int(metrics.uptime))}",
+            f"Loop lag: p50 {lag.quantile(0.5) * 1000:.0f}ms, p99 {lag.quantile(0.99) * 1000:.0f}ms, "
+            f"max {lag.max * 1000:.0f}ms",
+            "",
+            "Commands (count, p50, p95, errors)"
+        ]
+        for name, histogram in sorted(metrics.commands.items(), key=lambda item: -item[1].count):
+            rows.append(
+                f"  {name}: {histogram.count}, {histogram.quantile(0.5) * 1000:.0f}ms, "
+                f"{histogram.quantile(0.95) * 1000:.0f}ms, {metrics.command_errors[name]}"
+            )
+
+        rows += ["", "HTTP hosts (count, p50, p95, statuses)"]
+        for host, histogram in sorted(metrics.http.items(), key=lambda item: -item[1].count):
+            statuses: str = " ".join(
+                f"{status}x{count}" for (status_host, status), count in sorted(metrics.http_status.items())
+                if status_host == host
+            )
+            rows.append(
+                f"  {host}: {histogram.count}, {histogram.quantile(0.5) * 1000:.0f}ms, "
+                f"{histogram.quantile(0.95) * 1000:.0f}ms, {statuses}"
+            )
+
+        rows += ["", "Outbound governor (queued, shed, paused for)"]
+        for host, limiter in sorted(self.bot.http_client.governor.limiters.items()):
+            if limiter.queued or limiter.shed or limiter.throttled:
+                paused: float = max(0.0, limiter.blocked_until - monotonic())
+                rows.append(f"  {host}: {limiter.queued}, {limiter.shed}, {paused:.0f}s")
+
+        rows += ["", "Jobs (runs, mean, max)"]
+        for name, histogram in sorted(metrics.jobs.items()):
+            rows.append(f"  {name}: {histogram.count}, {histogram.mean:.2f}s, {histogram.max:.2f}s")
+
+        rows += ["", "Gateway events"]
+        rows += [f"  {event}: {count}" for event, count in metrics.gateway_events.most_common()]
+
+        paginator: LazyPaginator = LazyPaginator("Bot stats", rows, per_page=25)
+        await paginator.start(self.bot, ctx.channel, ctx.author)
+
+    @command(name="reload")
+    @is_owner()
+    async def reload_cog(self, ctx, extension: str) -> None:
+        """Reload a cog without restarting the bot, e.g. `.reload lichess_api`."""
+        if "." not in extension:
+            extension = f"ynb-bot.cogs.{extension}"
+        if extension not in self.bot.extensions:
+            await ctx.send(f"```{extension} is not loaded.```")
+            return
+
+        await self.bot.reload_cog_extension(extension)
+        await ctx.send(f"```{extension} reloaded.```")
+
+    @command(name="reload-config")
+    @has_role(554485497192513540)
+    async def reload_config(self, ctx) -> None:
+        """Reload conf.json without restarting the bot."""
+        self.bot.reload_conf()
+        await ctx.send("```Config reloaded.```")
 
 
 def setup(bot: Bot) -> None:
@@ -1,35 +1,315 @@
 import logging
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Deque, Optional, Union
 
-from discord.ext.commands import Cog, Bot
+from discord import Colour, Embed, Member, TextChannel
+from discord.ext.commands import Cog, Bot, group, Context, has_role
 
+from ..utils.conditional_cache import ConditionalCache
+from ..utils.governor import Priority, RateLimited, parse_retry_after
+from ..utils.link_store import LinkStore
 
-logger = logging.getLogger("bot" + __name__)
+
+logger = logging.getLogger("bot." + __name__)
+
+# The daily puzzle is fetched this long before it is posted.
+DAILY_PUZZLE_PREFETCH: timedelta = timedelta(minutes=15)
+
+# Chess.com game types shown on profiles, with their display names.
+RATED_GAME_TYPES: dict = {
+    "chess_rapid": "Rapid",
+    "chess_blitz": "Blitz",
+    "chess_bullet": "Bullet",
+    "chess_daily": "Daily"
+}
 
 
 class ChessComAPI(Cog):
     """
     Retrieve data from the Chess.com API.
 
-    TODO: UTILS
-    - Access Chess.com account with discord ID
-    - discord account id - chess username
-
-    TODO: COMMANDS
-    - Player profile + Player online status
-    - Clubs/team
-    - Tournaments
-    - Random puzzle
-
-    TODO: TIMED TASKS
-    - Send daily puzzle in TextChannel
+    Profiles, clubs, tournaments and the daily puzzle go through a conditional
+    request cache, so unchanged data comes back as a cheap 304. The daily puzzle
+    is fetched ahead of its posting time and a pool of random puzzles is kept
+    filled in the background.
     """
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.base_url: str = bot.conf.get("CHESS_COM_BASE_URL", "https://api.chess.com")
+        self.links: LinkStore = LinkStore(Path("ynb-bot", "resources", "chess_com.db"))
+        self.cache: ConditionalCache = ConditionalCache(
+            bot.http_client,
+            maxsize=bot.conf.get("CHESS_COM_CACHE_SIZE", 512)
+        )
+        self.puzzle_pool: Deque[dict] = deque(maxlen=bot.conf.get("CHESS_COM_PUZZLE_POOL_SIZE", 5))
+        self.daily_puzzle: Optional[dict] = None
 
+    def cog_unload(self) -> None:
+        """Stop the puzzle jobs and close the account links database."""
+        for job in ("chess-com-puzzle-pool", "chess-com-daily-prefetch", "chess-com-daily-puzzle"):
+            self.bot.scheduler.remove_job(job)
+        self.links.close()
 
-def setup(bot: Bot) -> None:
-    bot.add_cog(ChessComAPI(bot))
+    async def async_init(self) -> None:
+        """Keep the random puzzle pool filled and post the daily puzzle at CHESS_COM_DAILY_PUZZLE_TIME, in UTC."""
+        self.bot.scheduler.add_job("chess-com-puzzle-pool", self.fill_puzzle_pool, every=30)
+
+        if "CHESS_COM_PUZZLE_CHANNEL_ID" not in self.bot.conf:
+            return
+        post_time: time = time(*[int(i) for i in self.bot.conf.get("CHESS_COM_DAILY_PUZZLE_TIME", "17:00").split(":")])
+        prefetch_time: time = (datetime.combine(date.today(), post_time) - DAILY_PUZZLE_PREFETCH).time()
+        self.bot.scheduler.add_job("chess-com-daily-prefetch", self.prefetch_daily_puzzle, at=[prefetch_time])
+        self.bot.scheduler.add_job("chess-com-daily-puzzle", self.post_daily_puzzle, at=[post_time])
+
+    def snapshot_state(self) -> dict:
+        """Hand the response cache and puzzles over to a reloaded cog."""
+        return {"cache": self.cache, "puzzle_pool": self.puzzle_pool, "daily_puzzle": self.daily_puzzle}
+
+    def restore_state(self, state: dict) -> None:
+        self.cache = state["cache"]
+        self.puzzle_pool.extend(state["puzzle_pool"])
+        self.daily_puzzle = state["daily_puzzle"]
+
+    async def get_player(self, username: str) -> Union[dict, None]:
+        return await self.cache.get_json(f"{self.base_url}/pub/player/{username.lower()}")
+
+    async def get_player_stats(self, username: str) -> Union[dict, None]:
+        return await self.cache.get_json(f"{self.base_url}/pub/player/{username.lower()}/stats")
+
+    async def fetch_random_puzzle(self, priority: Priority = Priority.INTERACTIVE) -> Union[dict, None]:
+        """Request a random puzzle, never cached since every request should get a new one."""
+        url: str = f"{self.base_url}/pub/puzzle/random"
+        headers: dict = {"Accept": "application/json"}
+        try:
+            async with self.bot.http_client.get(url, priority=priority, headers=headers) as response:
+                if response.status == 429:
+                    raise RateLimited(response.url.host, parse_retry_after(response.headers.get("Retry-After")) or 60)
+                if response.status != 200:
+                    logger.error(f"Chess.com random puzzle request failed: {response.status}")
+                    return None
+                return await response.json(content_type=None)
+        except RateLimited:
+            raise
+        except Exception as e:
+            logger.error(f"Chess.com random puzzle request error: {e!r}")
+            return None
+
+    async def fill_puzzle_pool(self) -> None:
+        """Top up the pool of random puzzles."""
+        while len(self.puzzle_pool) < self.puzzle_pool.maxlen:
+            try:
+                puzzle: Union[dict, None] = await self.fetch_random_puzzle(Priority.BACKGROUND)
+            except RateLimited as e:
+                logger.info(f"Chess.com puzzle pool not filled: {e}")
+                return
+            # The endpoint is cached upstream for a short while, wait for the next run on a repeat.
+            if puzzle is None or any(pooled["url"] == puzzle["url"] for pooled in self.puzzle_pool):
+                return
+            self.puzzle_pool.append(puzzle)
+
+    async def prefetch_daily_puzzle(self) -> None:
+        self.daily_puzzle = await self.cache.get_json(f"{self.base_url}/pub/puzzle", Priority.BACKGROUND)
+        logger.info(f"Chess.com daily puzzle prefetched: {self.daily_puzzle and self.daily_puzzle['title']}")
+
+    async def post_daily_puzzle(self) -> None:
+        """Send the daily puzzle, prefetched earlier, to the puzzle channel."""
+        puzzle: Union[dict, None] = self.daily_puzzle
+        if puzzle is None:
+            puzzle = await self.cache.get_json(f"{self.base_url}/pub/puzzle", Priority.BACKGROUND)
+        self.daily_puzzle = None
+        if puzzle is None:
+            logger.error("Chess.com daily puzzle not available.")
+            return
+
+        puzzle_channel: TextChannel = self.bot.get_channel(self.bot.conf["CHESS_COM_PUZZLE_CHANNEL_ID"])
+        await puzzle_channel.send(embed=self.generate_puzzle_embed(puzzle, "Daily Puzzle"))
+
+    @group(name="chesscom", invoke_without_command=True)
+    async def chess_com(self, ctx: Context) -> None:
+        """Contains commands that access Chess.com API."""
+        await ctx.send_help(ctx.command)
+
+    @chess_com.command(name="link")
+    async def link_account(self, ctx: Context, username: str) -> None:
+        """Link Chess.com account with your discord."""
+        linked_username: Optional[str] = self.links.get_username(ctx.author.id)
+        if linked_username is not None:
+            await ctx.send(f"```Your discord is already linked with {linked_username}, unlink it first.```")
+            return
 
+        try:
+            player: Union[dict, None] = await self.get_player(username)
+        except RateLimited as e:
+            await ctx.send(f"```Chess.com is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
+        if not player:
+            await ctx.send("```Invalid Username.```")
+            return
 
+        if not await self.links.link(username, ctx.author.id):
+            await ctx.send(f"```{username} or your discord is already linked.```")
+            return
+        await ctx.send("```Account Linked Successfully.```")
 
+    @chess_com.command(name="unlink")
+    async def unlink_account(self, ctx: Context) -> None:
+        """Unlink Chess.com account from your discord."""
+        if await self.links.unlink(ctx.author.id) is None:
+            await ctx.send("Your discord is not linked to a Chess.com account.")
+            return
+        await ctx.send("```Account Unlinked Successfully.```")
 
+    @chess_com.command(name="profile")
+    async def player_profile(self, ctx: Context, discord_user: Optional[Member], username: str = None) -> None:
+        """
+        Display a Chess.com profile with its ratings and online status.
+
+        target: Chess.com username or tag the discord user, yourself by default
+        """
+        if discord_user or not username:
+            discord_user = discord_user or ctx.author
+            username = self.links.get_username(discord_user.id)
+            if username is None:
+                await ctx.send(f"```{discord_user} is not linked to a Chess.com account.```")
+                return
+
+        try:
+            player: Union[dict, None] = await self.get_player(username)
+            stats: Union[dict, None] = await self.get_player_stats(username) if player else None
+        except RateLimited as e:
+            await ctx.send(f"```Chess.com is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
+        if not player:
+            await ctx.send("```User not found.```")
+            return
+
+        await ctx.send(embed=self.generate_player_embed(player, stats or {}))
+
+    @chess_com.command(name="club")
+    async def club_information(self, ctx: Context, club_id: str) -> None:
+        """Display a Chess.com club, by the id in its URL."""
+        try:
+            club: Union[dict, None] = await self.cache.get_json(f"{self.base_url}/pub/club/{club_id.lower()}")
+        except RateLimited as e:
+            await ctx.send(f"```Chess.com is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
+        if not club:
+            await ctx.send("```Club not found.```")
+            return
+
+        embed: Embed = Embed(color=Colour.green())
+        embed.title = club["name"]
+        embed.url = club["url"]
+        embed.description = f"```Members: {club['members_count']}\n" \
+                            f"Created: {datetime.utcfromtimestamp(club['created']):%Y-%m-%d}\n" \
+                            f"Visibility: {club.get('visibility', '-')}```"
+        if club.get("icon"):
+            embed.set_thumbnail(url=club["icon"])
+        await ctx.send(embed=embed)
+
+    @chess_com.command(name="tournament")
+    async def tournament_information(self, ctx: Context, tournament_id: str) -> None:
+        """Display a Chess.com tournament, by the id in its URL."""
+        try:
+            tournament: Union[dict, None] = await self.cache.get_json(
+                f"{self.base_url}/pub/tournament/{tournament_id.lower()}"
+            )
+        except RateLimited as e:
+            await ctx.send(f"```Chess.com is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
+        if not tournament:
+            await ctx.send("```Tournament not found.```")
+            return
+
+        settings: dict = tournament.get("settings", {})
+        embed: Embed = Embed(color=Colour.green())
+        embed.title = tournament["name"]
+        embed.url = tournament["url"]
+        embed.description = f"```Status: {tournament['status']}\n" \
+                            f"Creator: {tournament['creator']}\n" \
+                            f"Type: {settings.get('type', '-')} {settings.get('time_class', '')}\n" \
+                            f"Time control: {settings.get('time_control', '-')}\n" \
+                            f"Players: {len(tournament.get('players', []))}```"
+        await ctx.send(embed=embed)
+
+    @chess_com.command(name="puzzle")
+    async def random_puzzle(self, ctx: Context) -> None:
+        """Send a random puzzle."""
+        if self.puzzle_pool:
+            puzzle: Union[dict, None] = self.puzzle_pool.popleft()
+        else:
+            try:
+                puzzle = await self.fetch_random_puzzle()
+            except RateLimited as e:
+                await ctx.send(f"```Chess.com is busy, try again in {e.retry_after:.0f} seconds.```")
+                return
+        if not puzzle:
+            await ctx.send("```No puzzle available, try again later.```")
+            return
+        await ctx.send(embed=self.generate_puzzle_embed(puzzle, "Random Puzzle"))
+
+    @chess_com.command(name="daily")
+    async def daily_puzzle_command(self, ctx: Context) -> None:
+        """Send today's daily puzzle."""
+        try:
+            puzzle: Union[dict, None] = await self.cache.get_json(f"{self.base_url}/pub/puzzle")
+        except RateLimited as e:
+            await ctx.send(f"```Chess.com is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
+        if not puzzle:
+            await ctx.send("```No puzzle available, try again later.```")
+            return
+        await ctx.send(embed=self.generate_puzzle_embed(puzzle, "Daily Puzzle"))
+
+    @chess_com.command(name="cache")
+    @has_role(554485497192513540)
+    async def cache_stats(self, ctx: Context) -> None:
+        """Display response cache statistics."""
+        stats: dict = self.cache.stats
+        msg: str = f"```Chess.com cache - {len(self.cache)}/{self.cache.maxsize} entries\n\n"
+        msg += "\n".join(f"{name.replace('_', ' ').title()}: {count}" for name, count in stats.items())
+        msg += f"\nPuzzle pool: {len(self.puzzle_pool)}/{self.puzzle_pool.maxlen}```"
+        await ctx.send(msg)
+
+    @staticmethod
+    def generate_player_embed(player: dict, stats: dict) -> Embed:
+        """Generate embed for a Chess.com player profile."""
+        last_online: datetime = datetime.utcfromtimestamp(player["last_online"])
+        idle: timedelta = datetime.utcnow() - last_online
+        online: str = "Online" if idle < timedelta(minutes=5) else f"Last online {last_online:%Y-%m-%d %H:%M} UTC"
+
+        embed: Embed = Embed(color=Colour.green())
+        embed.title = f"```{player['username']} Profile```"
+        embed.url = player["url"]
+        embed.description = f"```{online}\n" \
+                            f"Followers: {player.get('followers', 0)}\n" \
+                            f"Joined: {datetime.utcfromtimestamp(player['joined']):%Y-%m-%d}```"
+        if player.get("avatar"):
+            embed.set_thumbnail(url=player["avatar"])
+
+        embed.description += "**Game Modes**\n"
+        for game_type, name in RATED_GAME_TYPES.items():
+            if game_type not in stats:
+                continue
+            record: dict = stats[game_type]["record"]
+            embed.description += f"```**{name}**\n" \
+                                 f"Rating: {stats[game_type]['last']['rating']}\n" \
+                                 f"W/L/D: {record['win']}/{record['loss']}/{record['draw']}```"
+        return embed
+
+    @staticmethod
+    def generate_puzzle_embed(puzzle: dict, title: str) -> Embed:
+        """Generate embed for a Chess.com puzzle."""
+        embed: Embed = Embed(color=Colour.green())
+        embed.title = f"{title}: {puzzle['title']}"
+        embed.url = puzzle["url"]
+        embed.description = f"```FEN: {puzzle['fen']}```"
+        embed.set_image(url=puzzle["image"])
+        return embed
+
+
+def setup(bot: Bot) -> None:
+    bot.add_cog(ChessComAPI(bot))
+    logger.info("ChessComAPI cog loaded.")
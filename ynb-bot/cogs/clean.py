@@ -1,89 +1,160 @@
 import asyncio
 import logging
 from datetime import datetime, timedelta, time
+from json import load
 from pathlib import Path
+from typing import List, Optional
 
-from discord import TextChannel, Message, Embed, Colour, HTTPException, File
-from discord.ext.commands import Bot, Cog
+from discord import TextChannel, Message, NotFound, Object
+from discord.ext.commands import Bot, Cog, Context, group, has_role
+
+from ..utils.deleted_report import DeletedMessagesReport
 
 
 logger = logging.getLogger("bot." + __name__)
 
 ONE_WEEK: timedelta = timedelta(days=7)
 
+# Discord only bulk deletes messages younger than 14 days, 100 at a time.
+BULK_DELETE_MAX_AGE: timedelta = timedelta(days=14) - timedelta(minutes=5)
+BULK_DELETE_CHUNK: int = 100
+
 
 class Clean(Cog):
     """Clean channels by applying specific filters."""
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.cursor_file = Path("ynb-bot", "resources", "clean_cursor.json")
+        self.gallery_cursor: Optional[int] = self.get_gallery_cursor()
+        self.gallery_lock = asyncio.Lock()
+        self.reports_directory = Path("logs", "clean_reports")
+
+    def cog_unload(self) -> None:
+        """Stop the nightly cleanup."""
+        self.bot.scheduler.remove_job("clean-gallery")
+
+    def get_gallery_cursor(self) -> Optional[int]:
+        """Get the id of the last gallery message checked by a previous run."""
+        if not self.cursor_file.exists():
+            return None
+        with self.cursor_file.open() as f:
+            return load(f).get("GALLERY")
+
+    async def save_gallery_cursor(self) -> None:
+        """Write the gallery cursor to disk."""
+        await self.bot.file_writer.write_json(self.cursor_file, {"GALLERY": self.gallery_cursor})
 
     @staticmethod
-    def time_until_midnight() -> int:
-        """Calculate time until UTC midnight."""
-        now: datetime = datetime.utcnow()
-        midnight_time: time = time(19, 0, 0)
-        midnight: datetime = datetime.combine(now, midnight_time)
-
-        return (midnight - now).seconds
+    def filter_msgs(m: Message) -> bool:
+        # Do not delete message which has an attachment, eg: image.
+        if m.attachments:
+            return False
+        return True
+
+    async def purge_gallery(
+        self,
+        gallery_channel: TextChannel,
+        report: Optional[DeletedMessagesReport] = None,
+        dry_run: bool = False
+    ) -> int:
+        """
+        Remove messages except images posted in #gallery since the last run.
+
+        History is read after the saved cursor, so each run only checks new messages.
+        On the first run, the past week is checked. A dry run deletes nothing and
+        leaves the cursor where it was. Returns the number of matching messages,
+        each of which is also added to `report`.
+        """
+        async with self.gallery_lock:
+            if self.gallery_cursor is not None:
+                after = Object(id=self.gallery_cursor)
+            else:
+                after = datetime.utcnow() - ONE_WEEK
+
+            deleted: int = 0
+            chunk: List[Message] = []
+            cursor: Optional[int] = self.gallery_cursor
+
+            async for message in gallery_channel.history(limit=None, after=after, oldest_first=True):
+                cursor = message.id
+                if not self.filter_msgs(message):
+                    continue
+                deleted += 1
+                if report is not None:
+                    await report.add(message)
+                if dry_run:
+                    continue
+
+                chunk.append(message)
+                if len(chunk) == BULK_DELETE_CHUNK:
+                    await self.delete_chunk(gallery_channel, chunk, cursor)
+                    chunk = []
+
+            if not dry_run:
+                await self.delete_chunk(gallery_channel, chunk, cursor)
+
+            return deleted
+
+    async def delete_chunk(self, channel: TextChannel, messages: List[Message], cursor: Optional[int]) -> None:
+        """Bulk delete recent messages, delete old ones one by one, then save the cursor."""
+        bulk_after: datetime = datetime.utcnow() - BULK_DELETE_MAX_AGE
+        recent: List[Message] = [message for message in messages if message.created_at > bulk_after]
+        old: List[Message] = [message for message in messages if message.created_at <= bulk_after]
+
+        if recent:
+            await channel.delete_messages(recent)
+        for message in old:
+            try:
+                await message.delete()
+            except NotFound:
+                pass
+
+        if cursor != self.gallery_cursor:
+            self.gallery_cursor = cursor
+            await self.save_gallery_cursor()
 
     async def clean_gallery(self) -> None:
         """Remove messages except images from #gallery channel."""
-        logger.info("CLEAN GALLERY loop running!")
-        gallery_channel: TextChannel = await self.bot.fetch_channel(self.bot.conf["GALLERY_CHANNEL_ID"])
-        reporting_channel: TextChannel = await self.bot.fetch_channel(self.bot.conf["BOT_STATS_ID"])
-
-        while not self.bot.is_closed():
-            # wait for correct time before purging.
-            sleep_for: int = self.time_until_midnight()
-            minutes, seconds = divmod(sleep_for, 60)
-            hours, minutes = divmod(minutes, 60)
-            logger.info(f"Purging in {hours} hours {minutes} minutes.")
-            await reporting_channel.send(f"```Purging in {hours} hours {minutes} minutes.```")
-            await asyncio.sleep(sleep_for)
-
-            logger.info("Purging Messages...")
-
-            def filter_msgs(m: Message) -> bool:
-                # Do not delete message which has an attachment, eg: image.
-                if m.attachments:
-                    return False
-                return True
-
-            current_time: datetime = datetime.utcnow()
-
-            week_before: datetime = current_time - ONE_WEEK
-
-            deleted_messages: list = await gallery_channel.purge(
-                limit=None,
-                check=filter_msgs,
-                after=week_before
-            )
-
-            logger.info(f"{len(deleted_messages)} have been deleted.")
-
-            if deleted_messages:
-                embed: Embed = Embed(colour=Colour.red())
-                embed.title = f"{len(deleted_messages)} Messages have been deleted."
-                embed.description = ""
-                for message in deleted_messages:
-                    embed.description += f"\n**From: {message.author}**\n{message.content}\n"
-
-                try:
-                    await reporting_channel.send(embed=embed)
-                except Exception as e:
-                    if isinstance(e, HTTPException):
-                        logger.warning("Embed Body too long for reporting message, sending file instead.")
-                        deleted_messages_file = Path("deleted_messages.txt")
-                        deleted_messages_file.write_text(embed.description)
-                        file_object = File(fp=str(deleted_messages_file), filename="Deleted messages")
-                        await reporting_channel.send(file=file_object)
-
-            else:
-                await reporting_channel.send("0 Messages have been deleted.")
+        gallery_channel: TextChannel = self.bot.get_channel(self.bot.conf["GALLERY_CHANNEL_ID"])
+        reporting_channel: TextChannel = self.bot.get_channel(self.bot.conf["BOT_STATS_ID"])
+
+        logger.info("Purging Messages...")
+        report: DeletedMessagesReport = DeletedMessagesReport(self.reports_directory)
+        deleted: int = await self.purge_gallery(gallery_channel, report)
+        logger.info(f"{deleted} have been deleted.")
+        await report.send(reporting_channel)
+
+    @group(name="clean", invoke_without_command=True)
+    @has_role(554485497192513540)
+    async def clean(self, ctx: Context) -> None:
+        """Run the gallery cleanup on demand."""
+        await ctx.send_help(ctx.command)
+
+    @clean.command(name="run")
+    @has_role(554485497192513540)
+    async def clean_run(self, ctx: Context) -> None:
+        """Remove messages except images from #gallery now."""
+        gallery_channel: TextChannel = self.bot.get_channel(self.bot.conf["GALLERY_CHANNEL_ID"])
+        reporting_channel: TextChannel = self.bot.get_channel(self.bot.conf["BOT_STATS_ID"])
+        report: DeletedMessagesReport = DeletedMessagesReport(self.reports_directory)
+        deleted: int = await self.purge_gallery(gallery_channel, report)
+        logger.info(f"{deleted} have been deleted by {ctx.author}.")
+        await report.send(reporting_channel)
+        await ctx.send(f"```{deleted} Messages have been deleted.```")
+
+    @clean.command(name="dry-run")
+    @has_role(554485497192513540)
+    async def clean_dry_run(self, ctx: Context) -> None:
+        """Count the #gallery messages the next cleanup would remove."""
+        gallery_channel: TextChannel = self.bot.get_channel(self.bot.conf["GALLERY_CHANNEL_ID"])
+        deleted: int = await self.purge_gallery(gallery_channel, dry_run=True)
+        await ctx.send(f"```{deleted} Messages would be deleted.```")
 
 
 def setup(bot: Bot) -> None:
-    bot.loop.create_task(Clean(bot).clean_gallery())
-
-    bot.add_cog(Clean(bot))
+    cog: Clean = Clean(bot)
+    bot.add_cog(cog)
+    # Purge daily at GALLERY_CLEAN_TIME, in UTC.
+    clean_time: time = time(*[int(i) for i in bot.conf.get("GALLERY_CLEAN_TIME", "19:00").split(":")])
+    bot.scheduler.add_job("clean-gallery", cog.clean_gallery, at=[clean_time])
     logger.info("Clean Cog loaded.")
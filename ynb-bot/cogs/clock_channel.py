@@ -1,8 +1,9 @@
 import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
 
-from discord import VoiceChannel
+from discord import HTTPException, VoiceChannel
 from discord.ext.commands import Bot, Cog
 
 
@@ -36,48 +37,133 @@ CLOCK_EMOJIS: dict = {
 }
 
 
-class ClockChannel(Cog):
-    """Configure Clock voice channel to display UTC time."""
+# Discord allows two renames per channel every 10 minutes.
+RENAME_INTERVAL: int = 60 * 5
+# A run this close before a window boundary counts as part of the next window.
+RENAME_TOLERANCE: float = 5
 
-    def __init__(self, bot: Bot) -> None:
-        self.bot = bot
 
-    async def config_clock_channel(self):
-        """Change clock voice channel name to comply with current UTC time."""
-        clock_channel_id: int = self.bot.conf["CLOCK_CHANNEL_ID"]
-        while not self.bot.is_closed():
-            utc_time: datetime = datetime.utcnow()
+def build_clock_names() -> List[str]:
+    """Render the clock emoji and time for every minute of the day."""
+    names: List[str] = []
+    for minute_of_day in range(24 * 60):
+        hour, minutes = divmod(minute_of_day, 60)
+        clock_hour: int = hour % 12 or 12
+        emoji_name: str = f"clock{clock_hour}" if minutes < 30 else f"clock{clock_hour}30"
+        names.append(f"{CLOCK_EMOJIS[emoji_name]} {hour}:{minutes:02d}")
+    return names
 
-            hour: int = utc_time.hour
-            minutes: int = utc_time.minute
 
-            time_to_display: str = f"{hour}:{minutes}"
-            if minutes < 10:
-                time_to_display: str = f"{hour}:0{minutes}"
+CLOCK_NAMES: List[str] = build_clock_names()
 
-            if hour > 12:
-                hour = hour-12
 
-            if hour == 0:
-                hour = 12
+class Clock(NamedTuple):
+    channel_id: int
+    offset: timedelta
+    label: str
 
-            if minutes < 30:
-                emoji_name: str = f"clock{hour}"
-            else:
-                emoji_name = f"clock{hour}30"
 
-            clock_emoji: str = CLOCK_EMOJIS[emoji_name]
-            channel_name: str = f"{clock_emoji} {time_to_display} UTC"
+def parse_offset(offset: str) -> timedelta:
+    """Parse a UTC offset such as `+05:30` or `-4`."""
+    sign: int = -1 if offset.startswith("-") else 1
+    hours, _, minutes = offset.lstrip("+-").partition(":")
+    return sign * timedelta(hours=int(hours), minutes=int(minutes or 0))
 
-            channel: VoiceChannel = await self.bot.fetch_channel(clock_channel_id)
-            await channel.edit(name=channel_name)
-            await asyncio.sleep(60*5)
 
+class ClockChannel(Cog):
+    """
+    Configure clock voice channels to display the time.
 
-def setup(bot: Bot) -> None:
-    bot.loop.create_task(ClockChannel(bot).config_clock_channel())
+    Clocks are configured in conf.json, each with its own UTC offset:
 
-    bot.add_cog(ClockChannel(bot))
-    logger.info("ClockChannel cog loaded.")
+        "CLOCK_CHANNELS": [{"CHANNEL_ID": <id>, "UTC_OFFSET": "+05:30", "LABEL": "IST"}]
 
+    Without it, `CLOCK_CHANNEL_ID` displays UTC. Channels are renamed at most once
+    per rename window, on the window boundary, and only when the name changed.
+    A second rename in the same window, e.g. right after a reload, is skipped.
+    """
 
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self.clocks: List[Clock] = self.get_clocks()
+        self.rendered: Dict[int, str] = {}
+        self.renamed_in: Dict[int, int] = {}
+
+    def get_clocks(self) -> List[Clock]:
+        """Read the clock channels from the config."""
+        clocks_conf: Optional[list] = self.bot.conf.get("CLOCK_CHANNELS")
+        if not clocks_conf:
+            return [Clock(self.bot.conf["CLOCK_CHANNEL_ID"], timedelta(0), "UTC")]
+        return [
+            Clock(clock["CHANNEL_ID"], parse_offset(clock.get("UTC_OFFSET", "+0")), clock.get("LABEL", "UTC"))
+            for clock in clocks_conf
+        ]
+
+    async def async_init(self) -> None:
+        """Update the clocks now that the channel cache is ready, then on every rename window."""
+        self.bot.scheduler.add_job("clock-channel", self.config_clock_channel, every=RENAME_INTERVAL)
+        await self.config_clock_channel()
+
+    def snapshot_state(self) -> dict:
+        """Hand the rendered channel names over to a reloaded cog."""
+        return {"rendered": self.rendered, "renamed_in": self.renamed_in}
+
+    def restore_state(self, state: dict) -> None:
+        self.rendered = state["rendered"]
+        self.renamed_in = state.get("renamed_in", {})
+
+    def cog_unload(self) -> None:
+        """Stop updating the clock channels."""
+        self.bot.scheduler.remove_job("clock-channel")
+
+    @staticmethod
+    def render(clock: Clock, utc_time: datetime) -> str:
+        """Render the channel name of a clock at a given UTC time."""
+        local_time: datetime = utc_time + clock.offset
+        return f"{CLOCK_NAMES[local_time.hour * 60 + local_time.minute]} {clock.label}"
+
+    @staticmethod
+    def rename_window(utc_time: datetime) -> int:
+        """Index of the rename window `utc_time` falls in, on the same grid as the job."""
+        elapsed: float = (utc_time - datetime(1970, 1, 1)).total_seconds()
+        return int((elapsed + RENAME_TOLERANCE) // RENAME_INTERVAL)
+
+    async def config_clock_channel(self) -> None:
+        """Rename every clock channel whose displayed time changed."""
+        utc_time: datetime = datetime.utcnow()
+        await asyncio.gather(*(self.update_clock(clock, utc_time) for clock in self.clocks))
+
+    async def update_clock(self, clock: Clock, utc_time: datetime) -> None:
+        channel: Optional[VoiceChannel] = self.bot.get_channel(clock.channel_id)
+        if channel is None:
+            logger.warning(f"Clock channel {clock.channel_id} not found.")
+            return
+
+        channel_name: str = self.render(clock, utc_time)
+        if channel_name == self.rendered.get(clock.channel_id, channel.name):
+            return
+
+        # Windows are counted by index rather than by elapsed time, so wake-up jitter
+        # never makes two consecutive boundary renames look like one window.
+        window: int = self.rename_window(utc_time)
+        if self.renamed_in.get(clock.channel_id) == window:
+            logger.debug(f"Clock channel {clock.channel_id} already renamed in this window, skipped.")
+            return
+        self.renamed_in[clock.channel_id] = window
+        try:
+            await channel.edit(name=channel_name)
+        except HTTPException as e:
+            logger.error(f"Failed to rename clock channel {clock.channel_id}: {e}")
+            return
+        self.rendered[clock.channel_id] = channel_name
+
+    @Cog.listener()
+    async def on_conf_reload(self) -> None:
+        """Pick up clock channel changes from the reloaded config."""
+        self.clocks = self.get_clocks()
+
+
+def setup(bot: Bot) -> None:
+    cog: ClockChannel = ClockChannel(bot)
+    bot.add_cog(cog)
+    logger.info("ClockChannel cog loaded.")
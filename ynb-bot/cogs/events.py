@@ -1,9 +1,11 @@
 import logging
-from urllib.parse import urlparse
 
-import aiohttp
 from discord import Message
-from discord.ext.commands import Bot, Cog
+from discord.ext.commands import Bot, Cog, Context, command, has_role
+
+from ..utils.channel_router import Route
+from ..utils.link_checker import LinkChecker
+from ..utils.reaction_dispatcher import ReactionDispatcher
 
 
 logger = logging.getLogger("bot." + __name__)
@@ -15,6 +17,35 @@ class Events(Cog):
 
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.link_checker = LinkChecker(bot.http_client, timeout=bot.conf.get("LINK_CHECK_TIMEOUT", 5))
+        self.reactions = ReactionDispatcher(
+            workers=bot.conf.get("REACTION_WORKERS", 2),
+            maxsize=bot.conf.get("REACTION_QUEUE_SIZE", 100)
+        )
+
+        bot.router.register_handler("meme_reactions", self.react_to_meme)
+        bot.router.register_handler("reactions", self.react)
+
+    async def async_init(self) -> None:
+        """Cache the emojis once the guild is available, unless they were handed over by a reload."""
+        if EMOJIS:
+            self.build_routes()
+        else:
+            await self.load_emojis()
+
+    def snapshot_state(self) -> dict:
+        """Hand the emojis and link verdicts over to a reloaded cog."""
+        return {"emojis": dict(EMOJIS), "link_checker": self.link_checker}
+
+    def restore_state(self, state: dict) -> None:
+        EMOJIS.update(state["emojis"])
+        self.link_checker = state["link_checker"]
+
+    def cog_unload(self) -> None:
+        """Stop the reaction workers and remove the channel handlers."""
+        self.reactions.stop()
+        self.bot.router.remove_handler("meme_reactions")
+        self.bot.router.remove_handler("reactions")
 
     async def load_emojis(self):
         """Cache all emojis."""
@@ -24,47 +55,63 @@ class Events(Cog):
                 EMOJIS[emoji_name] = await guild.fetch_emoji(value)
             else:
                 EMOJIS[emoji_name] = value
+        self.build_routes()
 
-    @Cog.listener()
-    async def on_message(self, message: Message) -> None:
-        """Trigger this function when a message is sent in the guild."""
-        if message.channel.id == self.bot.conf["MEMES_CHANNEL_ID"]:
-            if await self.has_link(message) or message.attachments:
-                # Add all emojis
-                for emoji in EMOJIS.values():
-                    await message.add_reaction(emoji)
-
-        elif message.channel.id == self.bot.conf["FEEDBACK_CHANNEL_ID"]:
+    def build_routes(self) -> None:
+        """Build the channel routing table, defaulting to the memes and feedback channels."""
+        routes: dict = self.bot.conf.get("CHANNEL_ROUTES") or {
+            str(self.bot.conf["MEMES_CHANNEL_ID"]): {"handlers": ["meme_reactions"]},
             # Add all except LMFAO
-            for emoji_name, value in EMOJIS.items():
-                if emoji_name in ["LMFAO_EMOJI_ID"]:
-                    continue
-                await message.add_reaction(value)
-
-    async def has_link(self, message):
-        """Check if message contains a link."""
-        words: list = message.content.split()
-        links = [word for word in words if urlparse(word).scheme in ["https", "http"]]
-        if links:
-            return await self.verify_url(links)
-        return False
-
-    @staticmethod
-    async def verify_url(links: list) -> bool:
-        """Check if URL exists."""
-        for index, link in enumerate(links):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(link) as resp:
-                        if resp.status == 200:
-                            return True
-                        return False
-            except Exception as e:
-                logger.error(str(e))
-                return False
+            str(self.bot.conf["FEEDBACK_CHANNEL_ID"]): {
+                "handlers": ["reactions"],
+                "emojis": [name for name in self.bot.conf["EMOJIS"] if name != "LMFAO_EMOJI_ID"]
+            }
+        }
+        self.bot.router.build(routes, EMOJIS)
+
+    @Cog.listener()
+    async def on_conf_reload(self) -> None:
+        """Rebuild the channel routes from the reloaded config."""
+        await self.load_emojis()
+
+    async def react(self, message: Message, route: Route) -> None:
+        """Add the route's emojis to a message."""
+        self.reactions.submit(message, route.emojis)
+
+    async def react_to_meme(self, message: Message, route: Route) -> None:
+        """Add the route's emojis to a meme with an attachment or a valid link."""
+        if message.attachments:
+            self.reactions.submit(message, route.emojis)
+        else:
+            # Links are verified in the background so a slow host never holds up the router.
+            self.bot.loop.create_task(self.react_to_link(message, route))
+
+    async def react_to_link(self, message: Message, route: Route) -> None:
+        if await self.has_link(message):
+            self.reactions.submit(message, route.emojis)
+
+    async def has_link(self, message: Message) -> bool:
+        """Check if message contains a valid link."""
+        links: list = self.link_checker.find_links(message.content)
+        return await self.link_checker.has_valid_link(links)
+
+    @command(name="reactions")
+    @has_role(554485497192513540)
+    async def reaction_stats(self, ctx: Context) -> None:
+        """Display reaction queue statistics."""
+        p50, p95 = self.reactions.latency_percentile(50), self.reactions.latency_percentile(95)
+        msg: str = f"```Reaction queue\n\n" \
+                   f"Queued: {self.reactions.depth}/{self.reactions.maxsize}\n" \
+                   f"Processed: {self.reactions.processed}\n" \
+                   f"Dropped: {self.reactions.dropped}\n"
+        if p50 is not None:
+            msg += f"Latency p50: {p50:.2f}s\nLatency p95: {p95:.2f}s\n"
+        msg += "```"
+        await ctx.send(msg)
 
 
 def setup(bot: Bot):
-    bot.add_cog(Events(bot))
-    bot.loop.create_task(Events(bot).load_emojis())
+    cog: Events = Events(bot)
+    bot.add_cog(cog)
+    cog.reactions.start(bot.loop)
     logger.info("Events cog loaded.")
@@ -1,16 +1,36 @@
 import asyncio
 import logging
-from json import dump, load
+from collections import deque
+from datetime import datetime
+from json import load
 from pathlib import Path
-from typing import Union, List, Optional, Dict
+from time import perf_counter
+from typing import Union, List, Optional, Dict, Deque
 
-import aiohttp
 from discord import Member, Embed, Colour, TextChannel
-from discord.ext.commands import Cog, Bot, group, Context
+from discord.ext.commands import Cog, Bot, group, Context, has_role
+
+from ..utils.async_cache import AsyncTTLCache
+from ..utils.expiring_set import ExpiringSet
+from ..utils.governor import Priority, RateLimited
+from ..utils.leaderboard import LeaderboardRow, LeaderboardSnapshot
+from ..utils.lichess_stream import LichessGameStream, RATE_LIMIT_WAIT
+from ..utils.link_store import LinkStore
+from ..utils.paginator import LazyPaginator
 
 
 logger = logging.getLogger("bot." + __name__)
 
+# `/api/users/status` accepts at most this many ids per request.
+STATUS_IDS_PER_REQUEST: int = 100
+
+# `/api/users` accepts at most this many ids per request.
+USERS_IDS_PER_REQUEST: int = 300
+
+# Announced games are remembered for a day, which outlasts any game.
+ANNOUNCED_GAMES_TTL: int = 24 * 60 * 60
+ANNOUNCED_GAMES_MAXLEN: int = 1000
+
 
 class LichessAPI(Cog):
     """
@@ -18,27 +38,50 @@ class LichessAPI(Cog):
     """
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
-        self.json_file = Path("ynb-bot", "resources", "lichess.json")
-        self.linked_users = self.get_linked_users()
+        self.links: LinkStore = LinkStore(
+            Path("ynb-bot", "resources", "lichess.db"),
+            legacy_json_file=Path("ynb-bot", "resources", "lichess.json")
+        )
+        self.base_url: str = bot.conf.get("LICHESS_BASE_URL", "https://lichess.org")
+        self.announced_games_file = Path("ynb-bot", "resources", "lichess_announced.json")
+        self.announced_games: ExpiringSet = self.get_announced_games()
+        self.poll_semaphore = asyncio.Semaphore(bot.conf.get("LICHESS_POLL_CONCURRENCY", 5))
+        self.poll_timings: Deque[float] = deque(maxlen=100)
+        self.profile_cache: AsyncTTLCache = AsyncTTLCache(
+            self._load_user,
+            maxsize=bot.conf.get("LICHESS_PROFILE_CACHE_SIZE", 256),
+            ttl=bot.conf.get("LICHESS_PROFILE_CACHE_TTL", 60)
+        )
+        self.game_stream = LichessGameStream(bot.http_client, self.on_stream_game, self.base_url)
+        self.leaderboard: Optional[LeaderboardSnapshot] = None
 
-    @staticmethod
-    async def fetch(session: aiohttp.ClientSession, url: str, params=None) -> Union[dict, None]:
+    async def fetch(self, url: str, params=None, priority: Priority = Priority.INTERACTIVE) -> Union[dict, None]:
+        """Request JSON from the API, raising `RateLimited` when Lichess asks us to slow down."""
         headers: dict = {
             "Accept": 'application/json'
         }
         try:
-            async with session.get(url=url, params=params, headers=headers) as response:
+            async with self.bot.http_client.get(url, priority=priority, params=params, headers=headers) as response:
+                if response.status == 429:
+                    raise RateLimited(response.url.host, RATE_LIMIT_WAIT)
                 return await response.json(content_type=None)
+        except RateLimited:
+            raise
         except Exception as e:
             logger.error(f"API request error: {e}")
             return None
 
     async def _get_user(self, username: str) -> Union[dict, None]:
-        """Fetch User details."""
-        url: str = f"https://lichess.org/api/user/{username}"
-        async with aiohttp.ClientSession() as session:
-            response: Union[dict, None] = await self.fetch(session, url)
-            return response
+        """Fetch User details, served from the profile cache when possible."""
+        return await self.profile_cache.get(username.lower())
+
+    async def _load_user(self, username: str) -> Union[dict, None]:
+        """Request User details from the API."""
+        url: str = f"{self.base_url}/api/user/{username}"
+        response: Union[dict, None] = await self.fetch(url)
+        if response is None or "error" in response:
+            return None
+        return response
 
     @group(name="lichess", invoke_without_command=True)
     async def lichess(self, ctx: Context) -> None:
@@ -48,42 +91,94 @@ class LichessAPI(Cog):
     @lichess.command(name="link")
     async def link_account(self, ctx: Context, username: str) -> None:
         """Link lichess account with your discord."""
-        linked_usernames: List[str] = list(self.linked_users.keys())
-
-        if username.lower() in linked_usernames:
-            linked_discord_user: Member = self.bot.get_user(self.linked_users[username.lower()])
+        linked_discord_id: Optional[int] = self.links.get_discord_id(username)
+        if linked_discord_id is not None:
+            linked_discord_user: Member = self.bot.get_user(linked_discord_id)
             await ctx.send(f"```{username} is already linked with discord user {linked_discord_user}```")
             return
 
-        user: Union[dict, None] = await self._get_user(username)
-        if user:
-            self.linked_users[username.lower()] = ctx.author.id
-            self.update_linked_users()
-            await ctx.send("```Account Linked Successfully.```")
-        else:
+        linked_username: Optional[str] = self.links.get_username(ctx.author.id)
+        if linked_username is not None:
+            await ctx.send(f"```Your discord is already linked with {linked_username}, unlink it first.```")
+            return
+
+        try:
+            user: Union[dict, None] = await self._get_user(username)
+        except RateLimited as e:
+            await ctx.send(f"```Lichess is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
+        if not user:
             await ctx.send("```Invalid Username.```")
             return
 
+        # Either side may have been linked while the profile was being fetched.
+        if not await self.links.link(username, ctx.author.id):
+            await ctx.send(f"```{username} or your discord is already linked.```")
+            return
+
+        self.game_stream.set_users(self.links.usernames())
+        await ctx.send("```Account Linked Successfully.```")
+
     @lichess.command(name="unlink")
     async def unlink_account(self, ctx: Context) -> None:
         """Link lichess account with your discord."""
-        linked_discord_ids: List[int] = list(self.linked_users.values())
-
-        if ctx.author.id not in linked_discord_ids:
+        if await self.links.unlink(ctx.author.id) is None:
             await ctx.send("Your discord is not linked to a lichess account.")
             return
 
-        self.linked_users = {key: val for key, val in self.linked_users.items() if val != ctx.author.id}
-        self.update_linked_users()
+        self.game_stream.set_users(self.links.usernames())
         await ctx.send("```Account Unlinked Successfully.```")
 
     @lichess.command(name="showall")
     async def show_all_linked_users(self, ctx: Context) -> None:
         """Display all linked users."""
-        msg: str = "```Lichess Username - Discord Account\n\n"
-        for lichess_username, discord_id in self.linked_users.items():
-            discord_member = self.bot.get_user(discord_id)
-            msg += f"{lichess_username} - {discord_member}\n"
+        paginator: LazyPaginator = LazyPaginator(
+            "Lichess Username - Discord Account",
+            list(self.links.items()),
+            format_row=lambda link: f"{link[0]} - {self.bot.get_user(link[1])}",
+            empty_message="No linked accounts."
+        )
+        await paginator.start(self.bot, ctx, ctx.author)
+
+    @lichess.command(name="leaderboard")
+    async def leaderboard_command(self, ctx: Context, perf: str = "blitz") -> None:
+        """Rank linked members by rating in a perf type, e.g. `.lichess leaderboard rapid`."""
+        snapshot: Optional[LeaderboardSnapshot] = self.leaderboard
+        if snapshot is None:
+            await ctx.send("```The leaderboard is being built, try again in a minute.```")
+            return
+
+        perf_key: Optional[str] = snapshot.perf_key(perf)
+        if perf_key is None:
+            await ctx.send(f"```No ranked players in {perf}. Available: {', '.join(snapshot.perfs())}```")
+            return
+
+        rows: List[LeaderboardRow] = snapshot.view(perf_key)
+        minutes: float = (datetime.utcnow() - snapshot.fetched_at).total_seconds() // 60
+        paginator: LazyPaginator = LazyPaginator(
+            f"Lichess {perf_key} leaderboard - {len(rows)} players, updated {minutes:.0f} min ago",
+            enumerate(rows, 1),
+            format_row=lambda ranked: f"{ranked[0]:>4}. {ranked[1].username} - {ranked[1].rating}"
+                                      f"{'?' if ranked[1].provisional else ''} ({ranked[1].games} games)"
+        )
+        await paginator.start(self.bot, ctx, ctx.author)
+
+    @lichess.command(name="cache")
+    @has_role(554485497192513540)
+    async def cache_stats(self, ctx: Context) -> None:
+        """Display profile cache statistics and recent poll timings."""
+        stats: dict = self.profile_cache.stats
+        lookups: int = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        hit_rate: float = (stats["hits"] + stats["stale_hits"]) / lookups * 100 if lookups else 0
+        msg: str = f"```Profile cache - {len(self.profile_cache)}/{self.profile_cache.maxsize} entries\n\n"
+        msg += "\n".join(f"{name.replace('_', ' ').title()}: {count}" for name, count in stats.items())
+        msg += f"\nHit rate: {hit_rate:.1f}%"
+        if self.poll_timings:
+            timings: List[float] = sorted(self.poll_timings)
+            msg += (
+                f"\n\nLast {len(timings)} polls - median: {timings[len(timings) // 2] * 1000:.0f}ms, "
+                f"max: {timings[-1] * 1000:.0f}ms"
+            )
         msg += "```"
         await ctx.send(msg)
 
@@ -98,16 +193,17 @@ class LichessAPI(Cog):
             await ctx.send("```Lichess username or tag a discord user is a required parameter.```")
             return
 
-        if lichess_username and not discord_user:
-            user: Union[dict, None] = await self._get_user(lichess_username)
-        else:
-            try:
-                lichess_username = {val: key for key, val in self.linked_users.items()}[discord_user.id]
-            except KeyError:
+        if discord_user:
+            lichess_username = self.links.get_username(discord_user.id)
+            if lichess_username is None:
                 await ctx.send(f"```{discord_user} is not linked to a lichess account.```")
                 return
-            else:
-                user: Union[dict, None] = await self._get_user(lichess_username)
+
+        try:
+            user: Union[dict, None] = await self._get_user(lichess_username)
+        except RateLimited as e:
+            await ctx.send(f"```Lichess is busy, try again in {e.retry_after:.0f} seconds.```")
+            return
 
         if not user:
             await ctx.send(f"```User not found.```")
@@ -150,51 +246,165 @@ class LichessAPI(Cog):
 
         return embed
 
-    def get_linked_users(self) -> dict:
-        """Get linked users from json file."""
-        logger.info("Fetching Lichess linked accounts.")
-        with self.json_file.open() as f:
-            data: dict = load(f)
-        return data
-
-    def update_linked_users(self) -> None:
-        """Update json file containing user data."""
-        logger.info("Updating Lichess json file.")
-        with self.json_file.open("w") as f:
-            dump(self.linked_users, f, indent=2)
-
-    async def get_ongoing_games(self) -> None:
-        """Check status of each user and send link for on-going games."""
-        logger.info("Lichess - Get Ongoing Games loop running...")
+    def get_announced_games(self) -> ExpiringSet:
+        """Restore the ids of already announced games from the last run."""
+        announced_games: ExpiringSet = ExpiringSet(ANNOUNCED_GAMES_MAXLEN, ANNOUNCED_GAMES_TTL)
+        if self.announced_games_file.exists():
+            with self.announced_games_file.open() as f:
+                announced_games.update_from_dict(load(f))
+        return announced_games
+
+    async def save_announced_games(self) -> None:
+        """Write the ids of announced games to disk."""
+        await self.bot.file_writer.write_json(self.announced_games_file, self.announced_games.to_dict())
+
+    def snapshot_state(self) -> dict:
+        """Hand the announced games and cached profiles over to a reloaded cog."""
+        return {
+            "announced_games": self.announced_games,
+            "profile_cache_entries": self.profile_cache.export_entries(),
+            "poll_timings": self.poll_timings,
+            "leaderboard": self.leaderboard
+        }
+
+    def restore_state(self, state: dict) -> None:
+        self.announced_games = state["announced_games"]
+        self.profile_cache.import_entries(state["profile_cache_entries"])
+        self.poll_timings = state["poll_timings"]
+        self.leaderboard = state["leaderboard"]
+
+    def cog_unload(self) -> None:
+        """Stop announcing live games and close the account links database."""
+        self.bot.scheduler.remove_job("lichess-poll")
+        self.bot.scheduler.remove_job("lichess-stream")
+        self.bot.scheduler.remove_job("lichess-leaderboard")
+        self.links.close()
+
+    async def announce_game(self, game_id: str) -> None:
+        """Send the link of a live game to the chess channel, once per game."""
+        if game_id in self.announced_games:
+            return
+        self.announced_games.add(game_id)
+        await self.save_announced_games()
+
+        game_url: str = f"https://lichess.org/{game_id}"
         chess_channel: TextChannel = self.bot.get_channel(self.bot.conf["CHESS_CHANNEL_ID"])
-        games: list = []
-        while not self.bot.is_closed():
-            async with aiohttp.ClientSession() as session:
-                usernames: str = ",".join(list(self.linked_users.keys()))
-                url: str = "https://lichess.org/api/users/status"
-                params: dict = {
-                    "ids": usernames
-                }
-                all_users_status: dict = await self.fetch(session, url, params)
-                if all_users_status is not None:
-                    for user_status in all_users_status:
-                        if "playing" in user_status:
-                            fetch_game_url: str = f"https://lichess.org/api/user/{user_status['name']}/current-game"
-                            response: Union[dict, None] = await self.fetch(session, fetch_game_url)
-                            if not response:
-                                continue
-                            game_id: int = response["id"]
-                            game_url: str = f"https://lichess.org/{game_id}"
-                            if game_url not in games:
-                                games.append(game_url)
-                                msg: str = f"On Going Match! Spectate now!\n{game_url}"
-                                logger.info(f"Lichess Live game found: {game_url}")
-                                await chess_channel.send(msg)
-
-            await asyncio.sleep(10)
+        msg: str = f"On Going Match! Spectate now!\n{game_url}"
+        logger.info(f"Lichess Live game found: {game_url}")
+        await chess_channel.send(msg)
+
+    async def on_stream_game(self, game: dict) -> None:
+        """Announce a game started by a linked user on the game stream."""
+        await self.announce_game(game["id"])
+
+    async def async_init(self) -> None:
+        """
+        Announce live games using the configured mode, `stream` (default) or `poll`,
+        and refresh the leaderboard every LICHESS_LEADERBOARD_INTERVAL seconds.
+        """
+        if self.bot.conf.get("LICHESS_LIVE_MODE", "stream") == "poll":
+            self.bot.scheduler.add_job("lichess-poll", self.poll_ongoing_games, every=10)
+        else:
+            self.game_stream.set_users(self.links.usernames())
+            self.bot.scheduler.add_job("lichess-stream", self.game_stream.run)
+        self.bot.scheduler.add_job(
+            "lichess-leaderboard",
+            self.refresh_leaderboard,
+            every=self.bot.conf.get("LICHESS_LEADERBOARD_INTERVAL", 600)
+        )
+        if self.leaderboard is None:
+            self.bot.loop.create_task(self.refresh_leaderboard())
+
+    async def fetch_users(self, usernames: List[str]) -> List[dict]:
+        """Request the profiles of up to `USERS_IDS_PER_REQUEST` users at once."""
+        url: str = f"{self.base_url}/api/users"
+        async with self.bot.http_client.request(
+            "POST",
+            url,
+            priority=Priority.BACKGROUND,
+            data=",".join(usernames),
+            headers={"Content-Type": "text/plain", "Accept": "application/json"}
+        ) as response:
+            if response.status == 429:
+                raise RateLimited(response.url.host, RATE_LIMIT_WAIT)
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def refresh_leaderboard(self) -> None:
+        """Fetch every linked profile in bulk and replace the leaderboard snapshot."""
+        start: float = perf_counter()
+        usernames: List[str] = list(self.links.usernames())
+        chunks: List[List[str]] = [
+            usernames[i:i + USERS_IDS_PER_REQUEST] for i in range(0, len(usernames), USERS_IDS_PER_REQUEST)
+        ]
+        responses: list = await asyncio.gather(*(self.fetch_users(chunk) for chunk in chunks), return_exceptions=True)
+
+        failures: List[BaseException] = [response for response in responses if isinstance(response, BaseException)]
+        if failures and self.leaderboard is not None:
+            logger.warning(
+                f"Lichess leaderboard refresh failed for {len(failures)}/{len(chunks)} batches, "
+                f"keeping the last snapshot: {failures[0]!r}"
+            )
+            return
+
+        users: List[dict] = [user for response in responses if isinstance(response, list) for user in response]
+        self.leaderboard = LeaderboardSnapshot(users, self.links.by_username)
+        logger.debug(
+            f"Lichess leaderboard: {self.leaderboard.user_count} users in {len(chunks)} requests, "
+            f"took {(perf_counter() - start) * 1000:.0f}ms."
+        )
+
+    async def poll_ongoing_games(self) -> None:
+        """Fetch the status of all linked users in concurrent chunks and announce their games."""
+        start: float = perf_counter()
+        usernames: List[str] = list(self.links.usernames())
+        chunks: List[List[str]] = [
+            usernames[i:i + STATUS_IDS_PER_REQUEST] for i in range(0, len(usernames), STATUS_IDS_PER_REQUEST)
+        ]
+        url: str = f"{self.base_url}/api/users/status"
+        responses: list = await asyncio.gather(
+            *(
+                self.fetch(url, {"ids": ",".join(chunk), "withGameIds": "true"}, Priority.BACKGROUND)
+                for chunk in chunks
+            ),
+            return_exceptions=True
+        )
+        for response in responses:
+            if isinstance(response, RateLimited):
+                logger.warning(f"Lichess poll skipped a chunk: {response}")
+
+        playing: List[dict] = [
+            user_status
+            for all_users_status in responses if isinstance(all_users_status, list)
+            for user_status in all_users_status if "playing" in user_status
+        ]
+        await asyncio.gather(*(self.announce_user_game(user_status) for user_status in playing))
+
+        duration: float = perf_counter() - start
+        self.poll_timings.append(duration)
+        logger.debug(
+            f"Lichess poll: {len(usernames)} users in {len(chunks)} chunks, "
+            f"{len(playing)} playing, took {duration * 1000:.0f}ms."
+        )
+
+    async def announce_user_game(self, user_status: dict) -> None:
+        """Announce the current game of a playing user, fetching it when the status lacks its id."""
+        game_id: Optional[str] = user_status.get("playingId")
+        if game_id is None:
+            fetch_game_url: str = f"{self.base_url}/api/user/{user_status['name']}/current-game"
+            try:
+                async with self.poll_semaphore:
+                    response: Union[dict, None] = await self.fetch(fetch_game_url, priority=Priority.BACKGROUND)
+            except RateLimited as e:
+                logger.warning(f"Lichess current game of {user_status['name']} skipped: {e}")
+                return
+            if not response:
+                return
+            game_id = response["id"]
+        await self.announce_game(game_id)
 
 
 def setup(bot: Bot) -> None:
-    bot.loop.create_task(LichessAPI(bot).get_ongoing_games())
-    bot.add_cog(LichessAPI(bot))
+    cog: LichessAPI = LichessAPI(bot)
+    bot.add_cog(cog)
     logger.info("LichessAPI cog loaded.")
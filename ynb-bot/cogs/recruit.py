@@ -14,15 +14,22 @@ PLAN
 - change user's discord nickname to in-game username
 - send `whitelist add <in-game username>` in mc server console channel
 
-- when a user leaves, send `whitelist remove <nickname>` in mc server console channel
+- when a user leaves, send `whitelist remove <registered username>` in mc server console channel
+- reconcile the whitelist with the survival role holders periodically
 
 """
+import asyncio
 import logging
 from datetime import datetime
-from typing import Optional
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
 from discord import Colour, Embed, Member, Role, TextChannel
-from discord.ext.commands import Bot, Cog, command, Context
+from discord.ext.commands import BadArgument, Bot, Cog, command, Context, MemberConverter
+
+from ..utils.applicant_registry import Applicant, ApplicantRegistry
+from ..utils.governor import RateLimited
+from ..utils.mojang import MinecraftProfile, MojangProfiles
 
 
 logger = logging.getLogger("bot." + __name__)
@@ -37,10 +44,38 @@ APPLICANT_FORM_MESSAGE = "{author} added the following user to the MC branch:"
 WHITELIST_MESSAGE = "whitelist add {username}"
 REMOVE_WHITELIST_MESSAGE = "whitelist remove {username}"
 
+# Discord's message length limit.
+MESSAGE_LIMIT = 2000
+
 
 class Recruit(Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.mojang = MojangProfiles(
+            bot.http_client,
+            bot.conf.get("MOJANG_PROFILES_URL", "https://api.mojang.com/profiles/minecraft")
+        )
+        self.registry = ApplicantRegistry(Path("ynb-bot", "resources", "applicants.db"))
+
+    def cog_unload(self) -> None:
+        """Stop the whitelist reconciliation and close the applicant registry."""
+        self.bot.scheduler.remove_job("whitelist-reconcile")
+        self.registry.close()
+
+    def snapshot_state(self) -> dict:
+        """Hand the cached Mojang profiles over to a reloaded cog."""
+        return {"mojang": self.mojang}
+
+    def restore_state(self, state: dict) -> None:
+        self.mojang = state["mojang"]
+
+    async def async_init(self) -> None:
+        """Reconcile the whitelist every WHITELIST_RECONCILE_INTERVAL seconds."""
+        self.bot.scheduler.add_job(
+            "whitelist-reconcile",
+            self.reconcile_whitelist,
+            every=self.bot.conf.get("WHITELIST_RECONCILE_INTERVAL", 60 * 60)
+        )
 
     @property
     def minecraft_console_channel(self) -> Optional[TextChannel]:
@@ -51,13 +86,50 @@ class Recruit(Cog):
         guild = self.bot.get_guild(self.bot.conf["GUILD_ID"])
         return guild.get_role(self.bot.conf["SURVIVAL_MINECRAFT_ROLE_ID"])
 
-    async def is_game_username_valid(self, username: str) -> bool:
-        """Check if minecraft username is valid."""
-        url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
-        async with self.bot.http_session.get(url) as response:
-            if response.status == 200:
-                return True
-            return False
+    async def send_console_commands(self, commands: List[str]) -> None:
+        """Send server console commands, as few messages as the length limit allows."""
+        message = ""
+        for console_command in commands:
+            if message and len(message) + len(console_command) + 1 > MESSAGE_LIMIT:
+                await self.minecraft_console_channel.send(message)
+                message = ""
+            message = f"{message}\n{console_command}" if message else console_command
+        if message:
+            await self.minecraft_console_channel.send(message)
+
+    async def enroll(self, user: Member, profile: MinecraftProfile) -> None:
+        """Rename a member after their Minecraft username and give them the survival role."""
+        await user.edit(nick=profile.name)
+        await user.add_roles(self.survival_minecraft_role)
+
+    async def reconcile_whitelist(self) -> None:
+        """Whitelist the registered holders of the survival role and remove every other registered applicant."""
+        role: Optional[Role] = self.survival_minecraft_role
+        if role is None or not role.guild.chunked:
+            logger.warning("Whitelist reconciliation skipped, the survival role or its members are not available.")
+            return
+
+        holders: Set[int] = {member.id for member in role.members}
+        registered: Dict[int, Applicant] = self.registry.by_discord_id
+        whitelisted: Set[int] = {applicant.discord_id for applicant in registered.values() if applicant.whitelisted}
+        expected: Set[int] = holders & registered.keys()
+        to_add: Set[int] = expected - whitelisted
+        to_remove: Set[int] = whitelisted - expected
+
+        if to_add or to_remove:
+            commands: List[str] = [
+                WHITELIST_MESSAGE.format(username=registered[discord_id].username) for discord_id in to_add
+            ]
+            commands += [
+                REMOVE_WHITELIST_MESSAGE.format(username=registered[discord_id].username) for discord_id in to_remove
+            ]
+            await self.send_console_commands(commands)
+            await self.registry.set_whitelisted(to_add, True)
+            await self.registry.set_whitelisted(to_remove, False)
+        logger.info(
+            f"Whitelist reconciled: {len(to_add)} added, {len(to_remove)} removed, "
+            f"{len(holders - registered.keys())} role holders not registered."
+        )
 
     @staticmethod
     def build_applicant_embed(title: str, **applicant_data) -> Embed:
@@ -76,9 +148,19 @@ class Recruit(Cog):
     async def mc_branch(self, ctx: Context, user: Member, game_username: str, age: int, *, notes: str) -> None:
         """Add a user to the minecraft survival branch."""
         # Verify game username
-        if not await self.is_game_username_valid(game_username):
+        try:
+            profile: Optional[MinecraftProfile] = await self.mojang.lookup(game_username)
+        except RateLimited as e:
+            await ctx.send(f"Mojang is busy, try again in {e.retry_after:.0f} seconds.")
+            return
+        except Exception as e:
+            logger.error(f"Minecraft username lookup failed for {game_username}: {e!r}")
+            await ctx.send("Could not reach Mojang to verify the username, try again later.")
+            return
+        if profile is None:
             await ctx.send("Minecraft username not found!")
             return
+        game_username = profile.name
 
         # build verification embed
         applicant_data = {
@@ -90,11 +172,8 @@ class Recruit(Cog):
         embed = self.build_applicant_embed(VERIFICATION_MESSAGE, **applicant_data)
         await ctx.send(embed=embed)
 
-        # Change user's nick to minecraft username
-        await user.edit(nick=game_username)
-
-        # Give the user survival minecraft role
-        await user.add_roles(self.survival_minecraft_role)
+        # Change user's nick to minecraft username and give the user survival minecraft role
+        await self.enroll(user, profile)
 
         # List new user in #applicant-forms channel
         applicant_forms_channel = self.bot.get_channel(self.bot.conf["APPLICANT_FORMS_CHANNEL_ID"])
@@ -105,13 +184,92 @@ class Recruit(Cog):
         )
 
         # Whitelist user on the server
-        await self.minecraft_console_channel.send(WHITELIST_MESSAGE.format(username=game_username))
+        await self.send_console_commands([WHITELIST_MESSAGE.format(username=game_username)])
+        await self.registry.register(user.id, profile.uuid, profile.name)
+
+    @command(name="mcbranch-bulk")
+    async def mc_branch_bulk(self, ctx: Context, *, applicants: str) -> None:
+        """
+        Add many users to the minecraft survival branch at once.
+
+        One applicant per line: `@user game_username age notes`.
+        Usernames are checked together and the whitelist commands are sent as one message.
+        """
+        parsed: List[Tuple[Member, str, int, str]] = []
+        errors: List[str] = []
+        converter = MemberConverter()
+        for line in filter(None, (line.strip() for line in applicants.splitlines())):
+            parts = line.split(maxsplit=3)
+            try:
+                if len(parts) < 3:
+                    raise BadArgument("expected `@user game_username age notes`")
+                user: Member = await converter.convert(ctx, parts[0])
+                parsed.append((user, parts[1], int(parts[2]), parts[3] if len(parts) > 3 else ""))
+            except (BadArgument, ValueError) as e:
+                errors.append(f"{line[:50]}: {e}")
+
+        profiles: dict = await self.mojang.lookup_many(
+            (game_username for _, game_username, _, _ in parsed), return_exceptions=True
+        )
+
+        accepted: List[Tuple[Member, MinecraftProfile, int, str]] = []
+        for user, game_username, age, notes in parsed:
+            profile = profiles[game_username]
+            if isinstance(profile, RateLimited):
+                errors.append(f"{game_username}: Mojang is busy, try again in {profile.retry_after:.0f} seconds.")
+            elif isinstance(profile, Exception):
+                logger.error(f"Minecraft username lookup failed for {game_username}: {profile!r}")
+                errors.append(f"{game_username}: could not reach Mojang, try again later.")
+            elif profile is None:
+                errors.append(f"{game_username}: Minecraft username not found!")
+            else:
+                accepted.append((user, profile, age, notes))
+
+        results: list = await asyncio.gather(
+            *(self.enroll(user, profile) for user, profile, _, _ in accepted), return_exceptions=True
+        )
+        for applicant, result in zip(list(accepted), results):
+            if isinstance(result, Exception):
+                errors.append(f"{applicant[0]}: {result}")
+                accepted.remove(applicant)
+
+        applicant_forms_channel = self.bot.get_channel(self.bot.conf["APPLICANT_FORMS_CHANNEL_ID"])
+        for user, profile, age, notes in accepted:
+            await applicant_forms_channel.send(embed=self.build_applicant_embed(
+                    APPLICANT_FORM_MESSAGE.format(author=ctx.author.mention),
+                    **{
+                        "Minecraft Username": profile.name,
+                        "Discord Username": user.mention,
+                        "Reported Age": age,
+                        "Notes": notes
+                    }
+                )
+            )
+
+        await self.send_console_commands(
+            [WHITELIST_MESSAGE.format(username=profile.name) for _, profile, _, _ in accepted]
+        )
+        for user, profile, _, _ in accepted:
+            await self.registry.register(user.id, profile.uuid, profile.name)
+
+        msg = f"```Added {len(accepted)} users to the MC branch."
+        if errors:
+            msg += "\n\nSkipped:\n" + "\n".join(errors)
+        await ctx.send(msg[:MESSAGE_LIMIT - 3] + "```")
 
     @Cog.listener()
     async def on_member_remove(self, member: Member) -> None:
-        """Blacklist user from minecraft survival server."""
-        if self.survival_minecraft_role in member.roles:
-            await self.minecraft_console_channel.send(REMOVE_WHITELIST_MESSAGE.format(username=member.nick))
+        """Remove a leaving member from the minecraft survival server whitelist."""
+        applicant: Optional[Applicant] = await self.registry.remove(member.id)
+        if applicant is not None:
+            if applicant.whitelisted:
+                await self.send_console_commands([REMOVE_WHITELIST_MESSAGE.format(username=applicant.username)])
+            return
+
+        # Members enrolled before the registry existed are only known by role, with their nick as username.
+        role_id: int = self.bot.conf["SURVIVAL_MINECRAFT_ROLE_ID"]
+        if member.nick and any(role.id == role_id for role in member.roles):
+            await self.send_console_commands([REMOVE_WHITELIST_MESSAGE.format(username=member.nick)])
 
 
 def setup(bot: Bot) -> None:
@@ -2,9 +2,12 @@ import logging
 import typing
 from datetime import datetime, timedelta
 
-from discord import Member, Role
+from discord import Guild, Member
 from discord.ext.commands import command, Context, Cog, Bot, group
 
+from ..utils.member_index import MemberIndex
+from ..utils.paginator import LazyPaginator
+
 
 logger = logging.getLogger("bot." + __name__)
 
@@ -13,6 +16,42 @@ class ServerInformation(Cog):
     """Information regarding general server attributes."""
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.member_indexes: typing.Dict[int, MemberIndex] = {}
+
+    def get_member_index(self, guild: Guild) -> MemberIndex:
+        """Get the member index of a guild, building it on first use."""
+        index: typing.Optional[MemberIndex] = self.member_indexes.get(guild.id)
+        if index is None:
+            index = self.member_indexes[guild.id] = MemberIndex(guild.members)
+            logger.info(f"Member index built for {guild} with {len(index)} members.")
+        return index
+
+    def snapshot_state(self) -> dict:
+        """Hand the member indexes over to a reloaded cog."""
+        return {"member_indexes": self.member_indexes}
+
+    def restore_state(self, state: dict) -> None:
+        self.member_indexes = state["member_indexes"]
+
+    @Cog.listener()
+    async def on_ready(self) -> None:
+        """Drop the indexes after a reconnect, members may have changed while disconnected."""
+        self.member_indexes.clear()
+
+    @Cog.listener()
+    async def on_member_join(self, member: Member) -> None:
+        if member.guild.id in self.member_indexes:
+            self.member_indexes[member.guild.id].add(member)
+
+    @Cog.listener()
+    async def on_member_remove(self, member: Member) -> None:
+        if member.guild.id in self.member_indexes:
+            self.member_indexes[member.guild.id].remove(member.id)
+
+    @Cog.listener()
+    async def on_member_update(self, before: Member, after: Member) -> None:
+        if after.guild.id in self.member_indexes and before.roles != after.roles:
+            self.member_indexes[after.guild.id].update(after)
 
     @group(name="members", invoke_without_command=True)
     async def members_info(self, ctx: Context) -> None:
@@ -46,16 +85,11 @@ class ServerInformation(Cog):
         - Add the role ID before the filter_type
         example: .members list 3052305320 aged 7<
         """
-        filtered_members: list = []
-        members: list = ctx.guild.members
+        index: MemberIndex = self.get_member_index(ctx.guild)
 
-        if role_id:
-            role: Role = ctx.guild.get_role(role_id)
-            if role:
-                members = [member for member in members if role in member.roles]
-            else:
-                await ctx.send("Invalid Role ID.")
-                return
+        if role_id and not ctx.guild.get_role(role_id):
+            await ctx.send("Invalid Role ID.")
+            return
 
         if filter_type in ["before", "after"]:
             try:
@@ -63,15 +97,11 @@ class ServerInformation(Cog):
             except ValueError as e:
                 await ctx.send(f"```Invalid Date !\n {e}```")
                 return
-            for member in members:
 
-                if filter_type == "before":
-                    if date > member.joined_at:
-                        filtered_members.append(member)
-
-                else:  # filter_type=after
-                    if member.joined_at > date:
-                        filtered_members.append(member)
+            if filter_type == "before":
+                member_ids: list = index.joined_between(before=date, role_id=role_id)
+            else:  # filter_type=after
+                member_ids = index.joined_between(after=date, role_id=role_id)
 
         elif filter_type == "aged":
             today: datetime = datetime.today()
@@ -82,31 +112,24 @@ class ServerInformation(Cog):
                 await ctx.send("```Invalid Aged Filter !!\nAvailable options:\n>\n<```")
                 return
 
-            for member in members:
-
-                diff: timedelta = today - member.joined_at
-
-                if operator == "<":
-                    if diff.days < days:
-                        filtered_members.append(member)
-
-                elif operator == ">":
-                    if diff.days > days:
-                        filtered_members.append(member)
+            if operator == "<":
+                # Less than `days` whole days on the server.
+                member_ids = index.joined_between(after=today - timedelta(days=days), role_id=role_id)
+            else:
+                # More than `days` whole days on the server.
+                member_ids = index.joined_between(before=today - timedelta(days=days + 1), role_id=role_id)
 
         else:
             await ctx.send("```Invalid Filter !!```")
-
-        msg = f"```**FILTERED LIST OF MEMBERS - {len(filtered_members)} found**\n\n"
-
-        if filtered_members:
-            for filtered_member in filtered_members:
-                msg += f"{filtered_member} \n"
-
-            msg += "```"
-            await ctx.send(msg)
-        else:
-            await ctx.send("```0 Members found.```")
+            return
+
+        paginator: LazyPaginator = LazyPaginator(
+            f"**FILTERED LIST OF MEMBERS - {len(member_ids)} found**",
+            member_ids,
+            format_row=lambda member_id: str(ctx.guild.get_member(member_id)),
+            empty_message="0 Members found."
+        )
+        await paginator.start(self.bot, ctx, ctx.author)
 
 
 def setup(bot: Bot) -> None:
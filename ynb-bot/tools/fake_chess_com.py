@@ -0,0 +1,83 @@
+"""
+Local stand-in for the parts of the Chess.com API used by the bot.
+
+Run it with `python -m ynb-bot.tools.fake_chess_com --port 8081` and set
+`"CHESS_COM_BASE_URL": "http://127.0.0.1:8081"` in conf.json to test offline.
+"""
+import argparse
+import hashlib
+import logging
+import random
+from email.utils import formatdate
+from json import dumps, load
+from pathlib import Path
+from time import time
+
+from aiohttp import web
+
+
+logger = logging.getLogger("bot." + __name__)
+
+RECORDINGS_FILE: Path = Path(__file__).parent / "recordings" / "chess_com.json"
+
+
+class FakeChessCom:
+    """
+    aiohttp application serving recorded Chess.com responses.
+
+    Every recorded resource carries an `ETag` and a `Last-Modified` header and
+    is answered with 304 when a conditional request still matches it, like
+    the real API. `/pub/puzzle/random` picks one of its recorded puzzles.
+    """
+
+    def __init__(self, recordings_file: Path = RECORDINGS_FILE, max_age: int = 5) -> None:
+        with recordings_file.open() as f:
+            self.recordings: dict = load(f)
+        self.max_age = max_age
+        self.last_modified: str = formatdate(time(), usegmt=True)
+        self.requests: int = 0
+        self.not_modified: int = 0
+
+        self.app: web.Application = web.Application()
+        self.app.router.add_get("/pub/puzzle/random", self.random_puzzle)
+        self.app.router.add_get("/{path:pub/.+}", self.recorded)
+
+    async def recorded(self, request: web.Request) -> web.Response:
+        """Serve a recorded resource, honouring If-None-Match and If-Modified-Since."""
+        self.requests += 1
+        body = self.recordings.get(request.path.lower())
+        if body is None:
+            return web.json_response({"code": 0, "message": "Data provider not found for key"}, status=404)
+
+        text: str = dumps(body)
+        etag: str = f'"{hashlib.sha1(text.encode()).hexdigest()}"'
+        headers: dict = {
+            "ETag": etag,
+            "Last-Modified": self.last_modified,
+            "Cache-Control": f"max-age={self.max_age}"
+        }
+        if request.headers.get("If-None-Match") == etag or (
+            "If-None-Match" not in request.headers and request.headers.get("If-Modified-Since") == self.last_modified
+        ):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        return web.Response(text=text, content_type="application/json", headers=headers)
+
+    async def random_puzzle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        return web.json_response(random.choice(self.recordings["/pub/puzzle/random"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--max-age", type=int, default=5, help="seconds a response may be reused without a request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(FakeChessCom(max_age=args.max_age).app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Local stand-in for the parts of the Lichess API used by the bot.
+
+Run it with `python -m ynb-bot.tools.fake_lichess --port 8080` and set
+`"LICHESS_BASE_URL": "http://127.0.0.1:8080"` in conf.json to test offline.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import string
+from json import dumps
+from time import time
+
+from aiohttp import web
+
+
+logger = logging.getLogger("bot." + __name__)
+
+
+def random_game_id() -> str:
+    """Generate a Lichess-like 8 character game id."""
+    return "".join(random.choices(string.ascii_letters + string.digits, k=8))
+
+
+def game_event(game_id: str, white: str, black: str, status: int = 20) -> dict:
+    """Build a games-by-users stream event."""
+    return {
+        "id": game_id,
+        "rated": True,
+        "variant": "standard",
+        "speed": "blitz",
+        "perf": "blitz",
+        "createdAt": int(time() * 1000),
+        "status": status,
+        "statusName": "started" if status == 20 else "mate",
+        "players": {
+            "white": {"userId": white, "rating": 1500},
+            "black": {"userId": black, "rating": 1500}
+        }
+    }
+
+
+class FakeLichess:
+    """aiohttp application serving canned Lichess responses."""
+
+    def __init__(self, game_interval: float = 5, keep_alive: float = 2) -> None:
+        self.game_interval = game_interval
+        self.keep_alive = keep_alive
+
+        self.app: web.Application = web.Application()
+        self.app.router.add_post("/api/stream/games-by-users", self.stream_games_by_users)
+        self.app.router.add_get("/api/users/status", self.users_status)
+        self.app.router.add_get("/api/user/{username}/current-game", self.current_game)
+        self.app.router.add_post("/api/users", self.users)
+
+    async def users_status(self, request: web.Request) -> web.Response:
+        """Report every other requested user as playing."""
+        ids: list = request.query.get("ids", "").split(",")
+        if len(ids) > 100:
+            return web.json_response({"error": "Too many ids"}, status=400)
+
+        statuses: list = []
+        for index, username in enumerate(name for name in ids if name):
+            status: dict = {"id": username.lower(), "name": username}
+            if index % 2 == 0:
+                status["playing"] = True
+                if request.query.get("withGameIds") == "true":
+                    status["playingId"] = random_game_id()
+            statuses.append(status)
+        return web.json_response(statuses)
+
+    async def users(self, request: web.Request) -> web.Response:
+        """Return a profile with random ratings for every requested user."""
+        usernames: list = [name for name in (await request.text()).split(",") if name]
+        if len(usernames) > 300:
+            return web.json_response({"error": "Too many ids"}, status=400)
+
+        profiles: list = []
+        for username in usernames:
+            rng: random.Random = random.Random(username.lower())
+            perfs: dict = {
+                perf: {"games": rng.randint(0, 500), "rating": rng.randint(800, 2400), "rd": 50, "prog": 0}
+                for perf in ("bullet", "blitz", "rapid", "classical", "correspondence")
+            }
+            profiles.append({"id": username.lower(), "username": username, "perfs": perfs})
+        return web.json_response(profiles)
+
+    async def current_game(self, request: web.Request) -> web.Response:
+        """Return a fresh game for any user."""
+        return web.json_response(game_event(random_game_id(), request.match_info["username"], "anonymous"))
+
+    async def stream_games_by_users(self, request: web.Request) -> web.StreamResponse:
+        """Stream a started game for a random followed user every `game_interval` seconds."""
+        usernames: list = [name for name in (await request.text()).split(",") if name]
+        response: web.StreamResponse = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        logger.info(f"Stream opened for {len(usernames)} users.")
+
+        next_game: float = time() + self.game_interval
+        try:
+            while True:
+                if usernames and time() >= next_game:
+                    event: dict = game_event(random_game_id(), random.choice(usernames), "anonymous")
+                    await response.write(dumps(event).encode() + b"\n")
+                    next_game = time() + self.game_interval
+                else:
+                    await response.write(b"\n")
+                await asyncio.sleep(min(self.keep_alive, self.game_interval))
+        except ConnectionResetError:
+            logger.info("Stream closed.")
+        return response
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--game-interval", type=float, default=5, help="seconds between started games")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(FakeLichess(args.game_interval).app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
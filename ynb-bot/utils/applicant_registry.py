@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, ValuesView
+
+
+logger = logging.getLogger("bot." + __name__)
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS applicants (
+    discord_id INTEGER PRIMARY KEY,
+    uuid TEXT NOT NULL,
+    username TEXT NOT NULL,
+    whitelisted INTEGER NOT NULL DEFAULT 1
+)
+"""
+
+
+class Applicant(NamedTuple):
+    discord_id: int
+    uuid: str
+    username: str
+    whitelisted: bool
+
+
+class ApplicantRegistry:
+    """
+    Minecraft branch applicants by discord id, stored in SQLite.
+
+    Each entry records the Minecraft UUID and username the member was
+    whitelisted with, and whether they are currently on the whitelist. Entries
+    are indexed in memory and written on a dedicated thread, like `LinkStore`.
+    """
+
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = db_file
+        self.by_discord_id: Dict[int, Applicant] = {}
+
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="applicants")
+        self._connection: sqlite3.Connection = self._executor.submit(self._open).result()
+
+    def _open(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection = sqlite3.connect(str(self.db_file))
+        with connection:
+            connection.execute(SCHEMA)
+        for discord_id, uuid, username, whitelisted in connection.execute(
+            "SELECT discord_id, uuid, username, whitelisted FROM applicants"
+        ):
+            self.by_discord_id[discord_id] = Applicant(discord_id, uuid, username, bool(whitelisted))
+        logger.info(f"Loaded {len(self.by_discord_id)} applicants from {self.db_file}.")
+        return connection
+
+    def get(self, discord_id: int) -> Optional[Applicant]:
+        return self.by_discord_id.get(discord_id)
+
+    def applicants(self) -> ValuesView:
+        return self.by_discord_id.values()
+
+    def __len__(self) -> int:
+        return len(self.by_discord_id)
+
+    async def register(self, discord_id: int, uuid: str, username: str, whitelisted: bool = True) -> None:
+        """Record an applicant, replacing any previous entry for the same member."""
+        self.by_discord_id[discord_id] = Applicant(discord_id, uuid, username, whitelisted)
+        await self._write(
+            "INSERT OR REPLACE INTO applicants (discord_id, uuid, username, whitelisted) VALUES (?, ?, ?, ?)",
+            [(discord_id, uuid, username, int(whitelisted))]
+        )
+
+    async def remove(self, discord_id: int) -> Optional[Applicant]:
+        """Forget an applicant, returning their entry."""
+        applicant: Optional[Applicant] = self.by_discord_id.pop(discord_id, None)
+        if applicant is not None:
+            await self._write("DELETE FROM applicants WHERE discord_id = ?", [(discord_id,)])
+        return applicant
+
+    async def set_whitelisted(self, discord_ids: Iterable[int], whitelisted: bool) -> None:
+        """Mark several applicants as on or off the whitelist, in one transaction."""
+        discord_ids = [discord_id for discord_id in discord_ids if discord_id in self.by_discord_id]
+        for discord_id in discord_ids:
+            self.by_discord_id[discord_id] = self.by_discord_id[discord_id]._replace(whitelisted=whitelisted)
+        if discord_ids:
+            await self._write(
+                "UPDATE applicants SET whitelisted = ? WHERE discord_id = ?",
+                [(int(whitelisted), discord_id) for discord_id in discord_ids]
+            )
+
+    async def _write(self, query: str, rows: list) -> None:
+        def execute() -> None:
+            with self._connection:
+                self._connection.executemany(query, rows)
+
+        await asyncio.get_event_loop().run_in_executor(self._executor, execute)
+
+    def close(self) -> None:
+        """Finish pending writes and close the database."""
+        self._executor.submit(self._connection.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple
+
+
+logger = logging.getLogger("bot." + __name__)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fetched_at: float
+
+
+class AsyncTTLCache:
+    """
+    An LRU cache in front of an async `loader`.
+
+    - Values are fresh for `ttl` seconds, then served stale for up to `stale_ttl`
+      more seconds while a background refresh runs.
+    - `None` results are cached for `negative_ttl` seconds only.
+    - Concurrent loads of the same key share a single call to `loader`.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Awaitable[Any]],
+        maxsize: int = 256,
+        ttl: float = 60,
+        stale_ttl: float = 300,
+        negative_ttl: float = 15
+    ) -> None:
+        self.loader = loader
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "refreshes": 0
+        }
+
+    async def get(self, key: Hashable) -> Any:
+        """Return the cached value for `key`, loading it if needed."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age: float = monotonic() - entry.fetched_at
+            if entry.value is None:
+                fresh, usable = age < self.negative_ttl, False
+            else:
+                fresh, usable = age < self.ttl, age < self.ttl + self.stale_ttl
+
+            if fresh:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry.value
+
+            if usable:
+                self.stats["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self.stats["refreshes"] += 1
+                    self._load(key).add_done_callback(self._log_refresh_error)
+                return entry.value
+
+        self.stats["misses"] += 1
+        if key in self._inflight:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(self._load(key))
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget the cached value for `key`."""
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def export_entries(self) -> "OrderedDict[Hashable, CacheEntry]":
+        """Return the cached entries, to be handed to another cache with `import_entries`."""
+        return self._entries
+
+    def import_entries(self, entries: "OrderedDict[Hashable, CacheEntry]") -> None:
+        self._entries = entries
+
+    def _load(self, key: Hashable) -> asyncio.Future:
+        """Start loading `key`, or join the load already in flight."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = future
+        return future
+
+    async def _fetch(self, key: Hashable) -> Any:
+        try:
+            value: Any = await self.loader(key)
+        finally:
+            del self._inflight[key]
+
+        self._entries[key] = CacheEntry(value, monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return value
+
+    @staticmethod
+    def _log_refresh_error(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Background cache refresh failed: {future.exception()!r}")
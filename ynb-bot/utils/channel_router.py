@@ -0,0 +1,76 @@
+import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Tuple
+
+from discord import Message
+
+
+logger = logging.getLogger("bot." + __name__)
+
+
+class Route(NamedTuple):
+    channel_id: int
+    pipeline: Tuple[Callable[[Message, "Route"], Awaitable[None]], ...]
+    emojis: tuple
+
+
+class ChannelRouter:
+    """
+    Dispatch messages to per-channel handler pipelines with a single dict lookup.
+
+    Cogs register named handlers, and the routes in conf.json map a channel id to
+    the handlers it runs and the emojis those handlers use:
+
+        "CHANNEL_ROUTES": {
+            "<channel id>": {"handlers": ["<handler name>", ...], "emojis": ["<EMOJIS key>", ...]}
+        }
+
+    `emojis` defaults to every emoji. The routing table is precomputed by `build`
+    and rebuilt whenever a handler is registered or removed.
+    """
+
+    def __init__(self) -> None:
+        self.handlers: Dict[str, Callable[[Message, Route], Awaitable[None]]] = {}
+        self.table: Dict[int, Route] = {}
+        self._routes_conf: Dict[str, dict] = {}
+        self._emojis: Dict[str, object] = {}
+
+    def register_handler(self, name: str, handler: Callable[[Message, Route], Awaitable[None]]) -> None:
+        """Make a handler available to routes under `name`."""
+        self.handlers[name] = handler
+        self._rebuild()
+
+    def remove_handler(self, name: str) -> None:
+        self.handlers.pop(name, None)
+        self._rebuild()
+
+    def build(self, routes_conf: Dict[str, dict], emojis: Dict[str, object]) -> None:
+        """Precompute the routing table from the routes config and the cached emojis."""
+        self._routes_conf = routes_conf
+        self._emojis = dict(emojis)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        table: Dict[int, Route] = {}
+        for channel_id, route_conf in self._routes_conf.items():
+            pipeline: tuple = tuple(
+                self.handlers[name] for name in route_conf.get("handlers", []) if name in self.handlers
+            )
+            if not pipeline:
+                continue
+            emoji_names: list = route_conf.get("emojis", list(self._emojis))
+            emojis: tuple = tuple(self._emojis[name] for name in emoji_names if name in self._emojis)
+            table[int(channel_id)] = Route(int(channel_id), pipeline, emojis)
+        self.table = table
+        logger.debug(f"Channel routes rebuilt for {len(table)} channels.")
+
+    async def dispatch(self, message: Message) -> None:
+        """Run the pipeline of the message's channel, if it has one."""
+        route = self.table.get(message.channel.id)
+        if route is None:
+            return
+
+        for handler in route.pipeline:
+            try:
+                await handler(message, route)
+            except Exception as e:
+                logger.error(f"Channel handler {handler.__qualname__} failed: {e!r}")
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, NamedTuple, Optional, Pattern
+
+from .governor import Priority, RateLimited, parse_retry_after
+from .http import HTTPClient
+
+
+logger = logging.getLogger("bot." + __name__)
+
+MAX_AGE_PATTERN: Pattern = re.compile(r"max-age=(\d+)")
+
+
+class CachedResponse(NamedTuple):
+    body: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+
+class ConditionalCache:
+    """
+    Cache JSON GET responses and revalidate them with conditional requests.
+
+    A response is reused without a request for its `Cache-Control: max-age`, or
+    `ttl` seconds when the server gives none. After that it is revalidated with
+    its `ETag` and `Last-Modified` validators, and an unchanged resource comes
+    back as a bodyless 304. Missing resources (404) resolve to `None` and are
+    cached for `negative_ttl` seconds. When a request fails, the stale body is
+    served for another `negative_ttl` seconds, or `None` if there is none.
+    Only `RateLimited` is raised.
+    """
+
+    def __init__(
+        self,
+        http_client: HTTPClient,
+        maxsize: int = 512,
+        ttl: float = 5 * 60,
+        negative_ttl: float = 60
+    ) -> None:
+        self.http_client = http_client
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "not_modified": 0,
+            "modified": 0,
+            "evictions": 0,
+            "errors": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_json(self, url: str, priority: Priority = Priority.INTERACTIVE) -> Any:
+        """Return the JSON body at `url`, or `None` if it does not exist."""
+        entry: Optional[CachedResponse] = self._entries.get(url)
+        if entry is not None and entry.expires_at > monotonic():
+            self.stats["hits"] += 1
+            self._entries.move_to_end(url)
+            return entry.body
+
+        future: Optional[asyncio.Future] = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._revalidate(url, entry, priority))
+            self._inflight[url] = future
+        return await asyncio.shield(future)
+
+    def _max_age(self, cache_control: Optional[str]) -> float:
+        match = MAX_AGE_PATTERN.search(cache_control or "")
+        return float(match.group(1)) if match else self.ttl
+
+    async def _revalidate(self, url: str, entry: Optional[CachedResponse], priority: Priority) -> Any:
+        headers: dict = {"Accept": "application/json"}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            async with self.http_client.get(url, priority=priority, headers=headers) as response:
+                if response.status == 429:
+                    raise RateLimited(response.url.host, parse_retry_after(response.headers.get("Retry-After")) or 60)
+                max_age: float = self._max_age(response.headers.get("Cache-Control"))
+
+                if response.status == 304 and entry is not None:
+                    self.stats["not_modified"] += 1
+                    entry = entry._replace(expires_at=monotonic() + max_age)
+                elif response.status == 404:
+                    self.stats["modified"] += 1
+                    entry = CachedResponse(None, None, None, monotonic() + self.negative_ttl)
+                else:
+                    response.raise_for_status()
+                    self.stats["modified"] += 1
+                    entry = CachedResponse(
+                        await response.json(content_type=None),
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                        monotonic() + max_age
+                    )
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Request to {url} failed: {e!r}")
+            if entry is None:
+                return None
+            entry = entry._replace(expires_at=monotonic() + self.negative_ttl)
+        finally:
+            del self._inflight[url]
+
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return entry.body
+
+    def invalidate(self, url: str) -> None:
+        """Forget the cached response for `url`."""
+        self._entries.pop(url, None)
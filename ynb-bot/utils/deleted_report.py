@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import logging
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from discord import Colour, Embed, File, Message, TextChannel
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Discord's limit on the length of an embed description.
+EMBED_DESCRIPTION_LIMIT: int = 2048
+
+# Reports longer than this many pages are sent as a compressed file instead of embeds.
+MAX_EMBED_PAGES: int = 4
+
+
+class DeletedMessagesReport:
+    """
+    Record deleted messages as they are deleted.
+
+    Entries are appended to a report file in chunks, off the event loop. Embed
+    pages are only kept in memory while the report is small enough to send as
+    embeds; past that it is sent as a gzip attachment. Only the last `history`
+    report files are kept in `directory`.
+    """
+
+    def __init__(self, directory: Path, history: int = 10, chunk_size: int = 100) -> None:
+        self.directory = directory
+        self.history = history
+        self.chunk_size = chunk_size
+
+        self.count: int = 0
+        self.pages: Optional[List[str]] = []
+        self._page: List[str] = []
+        self._page_length: int = 0
+        self._pending: List[str] = []
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        timestamp: str = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        self.file: Path = self.directory / f"deleted_messages_{timestamp}.txt"
+        self._fp = self.file.open("w", encoding="utf-8")
+
+    async def add(self, message: Message) -> None:
+        """Record one deleted message."""
+        entry: str = f"\n**From: {message.author}**\n{message.content}\n"
+        self.count += 1
+        self._pending.append(entry)
+        if self.pages is not None:
+            self._add_to_page(entry[:EMBED_DESCRIPTION_LIMIT])
+        if len(self._pending) >= self.chunk_size:
+            await self._flush()
+
+    def _add_to_page(self, entry: str) -> None:
+        if self._page_length + len(entry) > EMBED_DESCRIPTION_LIMIT:
+            self.pages.append("".join(self._page))
+            self._page, self._page_length = [], 0
+            if len(self.pages) >= MAX_EMBED_PAGES:
+                # Too long for embeds, the file will be sent instead.
+                self.pages = None
+                return
+        self._page.append(entry)
+        self._page_length += len(entry)
+
+    async def _flush(self) -> None:
+        text: str = "".join(self._pending)
+        self._pending = []
+        await asyncio.get_event_loop().run_in_executor(None, self._fp.write, text)
+
+    async def send(self, channel: TextChannel) -> None:
+        """Finish the report and send it, as embeds when small or as a compressed file."""
+        await self._flush()
+        compressed: Path = await asyncio.get_event_loop().run_in_executor(None, self._close)
+
+        if not self.count:
+            await channel.send("0 Messages have been deleted.")
+            return
+
+        title: str = f"{self.count} Messages have been deleted."
+        if self.pages is None:
+            logger.warning("Report too long for embeds, sending file instead.")
+            await channel.send(f"**{title}**", file=File(fp=str(compressed), filename=compressed.name))
+            return
+
+        if self._page:
+            self.pages.append("".join(self._page))
+        for index, page in enumerate(self.pages):
+            embed: Embed = Embed(colour=Colour.red(), description=page)
+            if index == 0:
+                embed.title = title
+            await channel.send(embed=embed)
+
+    def _close(self) -> Path:
+        """Close and compress the report file, then drop reports beyond the history limit."""
+        self._fp.close()
+        compressed: Path = self.file.with_suffix(".txt.gz")
+        with self.file.open("rb") as source, gzip.open(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+        self.file.unlink()
+
+        reports: List[Path] = sorted(self.directory.glob("deleted_messages_*.txt.gz"))
+        for old_report in reports[:-self.history]:
+            old_report.unlink()
+        return compressed
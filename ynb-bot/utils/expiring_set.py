@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from time import time
+from typing import Dict, Hashable, Iterator, Optional
+
+
+class ExpiringSet:
+    """
+    A set that forgets items after `ttl` seconds and holds at most `maxlen` items.
+
+    Items are kept in insertion order so the oldest ones are dropped first.
+    Timestamps are wall-clock so the set can be saved and restored across restarts.
+    """
+
+    def __init__(self, maxlen: int = 1000, ttl: float = 24 * 60 * 60) -> None:
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self._items: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def add(self, item: Hashable, now: Optional[float] = None) -> None:
+        """Add an item, refreshing its expiry if it is already present."""
+        now = time() if now is None else now
+        self._items[item] = now
+        self._items.move_to_end(item)
+        self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Drop expired items and the oldest items over `maxlen`."""
+        now = time() if now is None else now
+        while self._items:
+            item, added = next(iter(self._items.items()))
+            if len(self._items) <= self.maxlen and now - added < self.ttl:
+                break
+            del self._items[item]
+
+    def __contains__(self, item: Hashable) -> bool:
+        added: Optional[float] = self._items.get(item)
+        if added is None:
+            return False
+        if time() - added >= self.ttl:
+            del self._items[item]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._items))
+
+    def to_dict(self) -> Dict[Hashable, float]:
+        """Return the items with the time they were added, for saving."""
+        self.prune()
+        return dict(self._items)
+
+    def update_from_dict(self, items: Dict[Hashable, float]) -> None:
+        """Restore items saved with `to_dict`, oldest first."""
+        for item, added in sorted(items.items(), key=lambda pair: pair[1]):
+            self._items[item] = added
+        self.prune()
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps
+from pathlib import Path
+from typing import Any, Dict
+
+
+logger = logging.getLogger("bot." + __name__)
+
+
+class BackgroundWriter:
+    """
+    Write files from a dedicated thread instead of the event loop.
+
+    Writes run one at a time, so two saves of the same file never interleave,
+    and each replaces its file atomically. A write requested while an earlier
+    one for the same file is still queued replaces it, so only the latest data
+    is written.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-writer")
+        self._lock: threading.Lock = threading.Lock()
+        self._pending: Dict[Path, Any] = {}
+        self._queued: Dict[Path, asyncio.Future] = {}
+
+    def write_json(self, path: Path, data: Any) -> asyncio.Future:
+        """
+        Save `data` as JSON to `path`, returning a future done once it is written.
+
+        `data` is serialized on the writer thread, so it must not be changed afterwards.
+        Each caller gets its own future, cancelling it does not cancel the write.
+        """
+        with self._lock:
+            self._pending[path] = data
+            future = self._queued.get(path)
+            if future is None:
+                future = asyncio.get_event_loop().run_in_executor(self._executor, self._write, path)
+                future.add_done_callback(lambda done: self._forget(path, done))
+                self._queued[path] = future
+        return asyncio.shield(future)
+
+    def _forget(self, path: Path, future: asyncio.Future) -> None:
+        """Stop handing out a finished write, even one that never ran."""
+        with self._lock:
+            if self._queued.get(path) is future:
+                del self._queued[path]
+
+    def _write(self, path: Path) -> None:
+        with self._lock:
+            self._queued.pop(path, None)
+            if path not in self._pending:
+                # Written by an earlier run along with a write that was cancelled.
+                return
+            data: Any = self._pending.pop(path)
+
+        temporary: Path = path.with_name(path.name + ".tmp")
+        temporary.parent.mkdir(parents=True, exist_ok=True)
+        with temporary.open("w") as f:
+            f.write(dumps(data))
+        os.replace(temporary, path)
+
+    def close(self) -> None:
+        """Finish the queued writes."""
+        self._executor.shutdown(wait=True)
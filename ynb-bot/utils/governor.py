@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from heapq import heappop, heappush
+from itertools import count
+from time import monotonic, time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Wait this long after a 429 without a Retry-After header, doubling up to MAX_RETRY_AFTER.
+DEFAULT_RETRY_AFTER: float = 60
+MAX_RETRY_AFTER: float = 10 * 60
+
+# Idle hosts are forgotten once more than this many are tracked.
+MAX_TRACKED_HOSTS: int = 256
+
+
+class Priority(IntEnum):
+    """Lower values go first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class RateLimited(Exception):
+    """The host asked us to slow down."""
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        super().__init__(f"{host} is rate limited, retry in {retry_after:.0f} seconds.")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class RequestShed(RateLimited):
+    """A background request was dropped because too much work is queued for its host."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the seconds to wait from a Retry-After header, in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    A token bucket for one host, refilled at `rate` requests per second up to `burst`.
+
+    Requests that cannot go at once wait in a priority queue, interactive ones
+    ahead of background ones. Once `max_queue` requests are waiting, further
+    background requests are shed.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int, max_queue: int, interactive_max_wait: float) -> None:
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.interactive_max_wait = interactive_max_wait
+
+        self.tokens: float = burst
+        self.updated: float = monotonic()
+        self.blocked_until: float = 0
+        self.throttled: int = 0
+        self.shed: int = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence: Iterator[int] = count()
+        self._releaser: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return not self._waiters and self.tokens >= self.burst and self.blocked_until <= monotonic()
+
+    def _refill(self) -> None:
+        now: float = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until the next request may be sent."""
+        self._refill()
+        wait: float = max(0.0, self.blocked_until - monotonic())
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    async def acquire(self, priority: Priority) -> None:
+        """Wait for a token, in priority order."""
+        if not self._waiters and self.delay() == 0:
+            self.tokens -= 1
+            return
+
+        blocked_for: float = self.blocked_until - monotonic()
+        if priority == Priority.INTERACTIVE and blocked_for > self.interactive_max_wait:
+            raise RateLimited(self.host, blocked_for)
+        if priority != Priority.INTERACTIVE and len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise RequestShed(self.host, self.delay())
+
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._releaser is None or self._releaser.done():
+            self._releaser = asyncio.ensure_future(self._release())
+        await future
+
+    async def _release(self) -> None:
+        while self._waiters:
+            wait: float = self.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            future: asyncio.Future = heappop(self._waiters)[2]
+            # Requests cancelled while queued give their turn away.
+            if not future.done():
+                self.tokens -= 1
+                future.set_result(None)
+
+    def record(self, status: int, retry_after: Optional[str]) -> None:
+        """Back off after a 429, or a 503 with Retry-After, following the server's hint."""
+        wait: Optional[float] = parse_retry_after(retry_after)
+        if status == 429 or (status == 503 and wait is not None):
+            self.throttled += 1
+            if wait is None:
+                wait = min(DEFAULT_RETRY_AFTER * 2 ** (self.throttled - 1), MAX_RETRY_AFTER)
+            self.blocked_until = max(self.blocked_until, monotonic() + wait)
+            self.tokens = 0
+            logger.warning(f"{self.host} answered {status}, pausing requests for {wait:.0f} seconds.")
+        else:
+            self.throttled = 0
+
+
+class OutboundGovernor:
+    """
+    Pace outbound requests per host.
+
+    Every request takes a token from its host's `HostLimiter` before it is sent,
+    and every response is reported back so 429s pause the host. Hosts listed in
+    `host_limits` get their own rate and burst, others get the defaults.
+    """
+
+    def __init__(
+        self,
+        host_limits: Optional[Dict[str, dict]] = None,
+        default_rate: float = 5,
+        default_burst: int = 10,
+        max_queue: int = 50,
+        interactive_max_wait: float = 10
+    ) -> None:
+        self.host_limits: Dict[str, dict] = host_limits or {}
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.max_queue = max_queue
+        self.interactive_max_wait = interactive_max_wait
+        self.limiters: Dict[str, HostLimiter] = {}
+
+    def limiter(self, host: str) -> HostLimiter:
+        limiter: Optional[HostLimiter] = self.limiters.get(host)
+        if limiter is None:
+            if len(self.limiters) >= MAX_TRACKED_HOSTS:
+                self.limiters = {name: tracked for name, tracked in self.limiters.items() if not tracked.idle}
+            limits: dict = self.host_limits.get(host, {})
+            limiter = self.limiters[host] = HostLimiter(
+                host,
+                limits.get("RATE", self.default_rate),
+                limits.get("BURST", self.default_burst),
+                self.max_queue,
+                self.interactive_max_wait
+            )
+        return limiter
+
+    async def acquire(self, host: str, priority: Priority = Priority.INTERACTIVE) -> None:
+        await self.limiter(host).acquire(priority)
+
+    def record(self, host: str, status: int, retry_after: Optional[str] = None) -> None:
+        self.limiter(host).record(status, retry_after)
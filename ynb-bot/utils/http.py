@@ -0,0 +1,122 @@
+import logging
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator, Optional
+
+from aiohttp import ClientResponse, ClientSession, ClientTimeout, TCPConnector
+from yarl import URL
+
+from .governor import OutboundGovernor, Priority
+from .metrics import Metrics
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Defaults used when the `HTTP` section of conf.json does not override them.
+DEFAULT_HTTP_CONF: dict = {
+    "LIMIT": 100,  # total pooled connections
+    "LIMIT_PER_HOST": 10,  # pooled connections per host
+    "KEEPALIVE_TIMEOUT": 30,  # seconds an idle connection is kept open
+    "DNS_CACHE_TTL": 300,  # seconds a resolved host is cached
+    "TOTAL_TIMEOUT": 30,  # seconds for a whole request
+    "CONNECT_TIMEOUT": 10,  # seconds to acquire a connection
+    "DEFAULT_RATE": 5,  # requests per second to a host without its own limits
+    "DEFAULT_BURST": 10,  # requests sent at once to such a host
+    "HOST_LIMITS": {  # per host RATE and BURST
+        "lichess.org": {"RATE": 1, "BURST": 4},
+        "api.mojang.com": {"RATE": 1, "BURST": 5},
+        "api.chess.com": {"RATE": 2, "BURST": 4}
+    },
+    "MAX_QUEUE": 50,  # waiting requests per host before background ones are shed
+    "INTERACTIVE_MAX_WAIT": 10  # seconds an interactive request may wait out a 429 pause
+}
+
+
+class HTTPClient:
+    """
+    A single pooled aiohttp session shared by every cog.
+
+    Requests are paced per host by an `OutboundGovernor`. Interactive requests
+    go ahead of background ones, which pass `priority=Priority.BACKGROUND`.
+    """
+
+    def __init__(self, conf: Optional[dict] = None, metrics: Optional[Metrics] = None) -> None:
+        self.conf: dict = {**DEFAULT_HTTP_CONF, **(conf or {})}
+        self.conf["HOST_LIMITS"] = {**DEFAULT_HTTP_CONF["HOST_LIMITS"], **(conf or {}).get("HOST_LIMITS", {})}
+        self.metrics = metrics
+        self.governor: OutboundGovernor = OutboundGovernor(
+            self.conf["HOST_LIMITS"],
+            self.conf["DEFAULT_RATE"],
+            self.conf["DEFAULT_BURST"],
+            self.conf["MAX_QUEUE"],
+            self.conf["INTERACTIVE_MAX_WAIT"]
+        )
+        self._session: Optional[ClientSession] = None
+
+    @property
+    def session(self) -> ClientSession:
+        """Return the shared session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector: TCPConnector = TCPConnector(
+                limit=self.conf["LIMIT"],
+                limit_per_host=self.conf["LIMIT_PER_HOST"],
+                keepalive_timeout=self.conf["KEEPALIVE_TIMEOUT"],
+                ttl_dns_cache=self.conf["DNS_CACHE_TTL"],
+                use_dns_cache=True
+            )
+            timeout: ClientTimeout = ClientTimeout(
+                total=self.conf["TOTAL_TIMEOUT"],
+                connect=self.conf["CONNECT_TIMEOUT"]
+            )
+            self._session = ClientSession(connector=connector, timeout=timeout)
+            logger.info("HTTP session created.")
+        return self._session
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs
+    ) -> AsyncIterator[ClientResponse]:
+        """
+        Send a request through the shared session once the governor lets it go.
+
+        Raises `RateLimited` when the host is paused after a 429, or `RequestShed`
+        when a background request finds too much work queued for its host.
+        """
+        host: str = URL(url).host or ""
+        await self.governor.acquire(host, priority)
+
+        start: float = perf_counter()
+        status: Optional[str] = None
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                status = str(response.status)
+                self._observe(host, status, start)
+                self.governor.record(host, response.status, response.headers.get("Retry-After"))
+                yield response
+        except Exception as e:
+            if status is None:
+                self._observe(host, type(e).__name__, start)
+            raise
+
+    def _observe(self, host: str, status: str, start: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_http(host, status, perf_counter() - start)
+
+    def get(self, url: str, **kwargs):
+        """Send a GET request through the shared session."""
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        """Send a HEAD request through the shared session."""
+        return self.request("HEAD", url, **kwargs)
+
+    async def close(self) -> None:
+        """Close the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP session closed.")
+        self._session = None
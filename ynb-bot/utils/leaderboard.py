@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+
+class LeaderboardRow(NamedTuple):
+    rating: int
+    username: str
+    discord_id: int
+    games: int
+    provisional: bool
+
+
+class LeaderboardSnapshot:
+    """
+    Ratings of linked users at one point in time.
+
+    A view sorted by rating is built for every perf type once, when the
+    snapshot is made, so reads only slice a ready list. Snapshots are never
+    changed after they are built, a refresh replaces the whole snapshot.
+    """
+
+    def __init__(self, users: Iterable[dict], links: Mapping[str, int]) -> None:
+        self.fetched_at: datetime = datetime.utcnow()
+        self.user_count: int = 0
+        views: Dict[str, List[LeaderboardRow]] = {}
+        for user in users:
+            discord_id: Optional[int] = links.get(user["id"])
+            if discord_id is None or user.get("disabled") or user.get("tosViolation"):
+                continue
+            self.user_count += 1
+            for perf, stats in user.get("perfs", {}).items():
+                if "rating" not in stats or not stats.get("games"):
+                    continue
+                views.setdefault(perf, []).append(LeaderboardRow(
+                    stats["rating"], user["username"], discord_id, stats["games"], bool(stats.get("prov"))
+                ))
+
+        for rows in views.values():
+            rows.sort(key=lambda row: (-row.rating, row.username.lower()))
+        self.views: Dict[str, List[LeaderboardRow]] = views
+        # Lichess perf keys are camelCase, e.g. `ultraBullet`, users type them in any case.
+        self.perf_keys: Dict[str, str] = {perf.lower(): perf for perf in views}
+
+    def perfs(self) -> List[str]:
+        """The perf types with at least one ranked user, most played first."""
+        return sorted(self.views, key=lambda perf: -len(self.views[perf]))
+
+    def perf_key(self, perf: str) -> Optional[str]:
+        """The perf key as Lichess spells it, matched case-insensitively."""
+        return self.perf_keys.get(perf.lower())
+
+    def view(self, perf: str) -> Optional[List[LeaderboardRow]]:
+        return self.views.get(self.perf_key(perf))
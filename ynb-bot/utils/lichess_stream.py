@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import random
+from json import loads, JSONDecodeError
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from aiohttp import ClientTimeout
+
+from .governor import Priority, RateLimited
+from .http import HTTPClient
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Lichess game status code of a game that has just started.
+STARTED_STATUS: int = 20
+
+# Lichess accepts at most this many ids on the games-by-users stream.
+MAX_STREAM_USERS: int = 300
+
+# Lichess asks clients to wait a full minute after a 429.
+RATE_LIMIT_WAIT: int = 60
+
+
+class LichessGameStream:
+    """
+    Follow the games of a set of users over one long-lived NDJSON connection.
+
+    `on_game` is awaited with the decoded event of every game that starts.
+    """
+
+    def __init__(
+        self,
+        http_client: HTTPClient,
+        on_game: Callable[[dict], Awaitable[None]],
+        base_url: str = "https://lichess.org",
+        min_backoff: float = 1,
+        max_backoff: float = 60,
+        read_timeout: float = 60
+    ) -> None:
+        self.http_client = http_client
+        self.on_game = on_game
+        self.url: str = f"{base_url}/api/stream/games-by-users"
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.timeout: ClientTimeout = ClientTimeout(total=None, sock_read=read_timeout)
+
+        self.usernames: List[str] = []
+        self._changed: asyncio.Event = asyncio.Event()
+
+    def set_users(self, usernames: Iterable[str]) -> None:
+        """Replace the followed users and resubscribe if they changed."""
+        usernames: List[str] = sorted(set(usernames))
+        if len(usernames) > MAX_STREAM_USERS:
+            logger.warning(f"Lichess stream only follows the first {MAX_STREAM_USERS} of {len(usernames)} users.")
+            usernames = usernames[:MAX_STREAM_USERS]
+
+        if usernames != self.usernames:
+            self.usernames = usernames
+            self._changed.set()
+
+    async def run(self) -> None:
+        """Keep the stream connected, reconnecting with backoff and resubscribing on changes."""
+        logger.info("Lichess - Game stream running...")
+        backoff: float = self.min_backoff
+        while True:
+            self._changed.clear()
+            if not self.usernames:
+                await self._changed.wait()
+                continue
+
+            read_task: asyncio.Task = asyncio.ensure_future(self._read_stream())
+            changed_task: asyncio.Task = asyncio.ensure_future(self._changed.wait())
+            try:
+                done, _ = await asyncio.wait([read_task, changed_task], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                read_task.cancel()
+                changed_task.cancel()
+
+            if changed_task in done:
+                logger.info(f"Lichess stream resubscribing to {len(self.usernames)} users.")
+                backoff = self.min_backoff
+                continue
+
+            rate_limited: bool = False
+            try:
+                received: bool = read_task.result()
+            except RateLimited:
+                received, rate_limited = False, True
+            except Exception as e:
+                logger.error(f"Lichess stream error: {e!r}")
+                received = False
+
+            # A connection that delivered data was healthy, so start the backoff again.
+            if received:
+                backoff = self.min_backoff
+            wait: float = RATE_LIMIT_WAIT if rate_limited else backoff
+            backoff = min(backoff * 2, self.max_backoff)
+            wait = wait * random.uniform(0.5, 1)
+            logger.info(f"Lichess stream disconnected, reconnecting in {wait:.1f} seconds.")
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _read_stream(self) -> bool:
+        """Read events until the server closes the connection, return whether anything arrived."""
+        received: bool = False
+        async with self.http_client.request(
+            "POST",
+            self.url,
+            priority=Priority.BACKGROUND,
+            params={"withCurrentGames": "true"},
+            data=",".join(self.usernames),
+            headers={"Content-Type": "text/plain"},
+            timeout=self.timeout
+        ) as response:
+            if response.status == 429:
+                raise RateLimited(response.url.host, RATE_LIMIT_WAIT)
+            response.raise_for_status()
+            logger.info(f"Lichess stream connected for {len(self.usernames)} users.")
+
+            async for line in response.content:
+                received = True
+                event: Optional[dict] = self.parse_line(line)
+                if event is not None and event.get("status") == STARTED_STATUS:
+                    await self.on_game(event)
+        return received
+
+    @staticmethod
+    def parse_line(line: bytes) -> Optional[dict]:
+        """Decode a single NDJSON line, ignoring keep-alive blank lines."""
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return loads(line)
+        except JSONDecodeError:
+            logger.warning(f"Lichess stream sent an invalid line: {line[:100]!r}")
+            return None
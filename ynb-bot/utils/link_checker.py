@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import re
+import socket
+from collections import OrderedDict
+from typing import List, Optional, Pattern
+from urllib.parse import urlsplit
+
+from aiohttp import ClientConnectionError, ClientTimeout
+
+from .async_cache import AsyncTTLCache
+from .expiring_set import ExpiringSet
+from .governor import Priority, RateLimited
+from .http import HTTPClient
+
+
+logger = logging.getLogger("bot." + __name__)
+
+URL_PATTERN: Pattern = re.compile(r"\bhttps?://[^\s<>]+", re.IGNORECASE)
+
+# Servers that refuse HEAD usually answer one of these.
+HEAD_UNSUPPORTED: set = {403, 405, 501}
+
+# A host is skipped after this many failed checks in a row, or at once when its name does not resolve.
+FAILURES_BEFORE_DEAD: int = 3
+
+
+class LinkChecker:
+    """
+    Verify that links point to something that exists.
+
+    Verdicts are cached per URL. Hosts whose name does not resolve, or that
+    failed `FAILURES_BEFORE_DEAD` checks in a row, are remembered so further
+    links to them fail without a request: for `dead_domain_ttl` seconds, or
+    only `slow_domain_ttl` when the last failure was a timeout. Failed checks
+    return `None`, which is only cached briefly.
+    """
+
+    def __init__(
+        self,
+        http_client: HTTPClient,
+        timeout: float = 5,
+        maxsize: int = 1024,
+        ttl: float = 60 * 60,
+        dead_domain_ttl: float = 10 * 60,
+        slow_domain_ttl: float = 60
+    ) -> None:
+        self.http_client = http_client
+        self.timeout: ClientTimeout = ClientTimeout(total=timeout)
+        self.verdicts: AsyncTTLCache = AsyncTTLCache(self._verify, maxsize=maxsize, ttl=ttl, stale_ttl=0)
+        self.dead_domains: ExpiringSet = ExpiringSet(maxlen=maxsize, ttl=dead_domain_ttl)
+        self.slow_domains: ExpiringSet = ExpiringSet(maxlen=maxsize, ttl=slow_domain_ttl)
+        self.failures: "OrderedDict[str, int]" = OrderedDict()
+
+    @staticmethod
+    def find_links(text: str) -> List[str]:
+        """Return the distinct http(s) links in `text`, in order."""
+        return list(dict.fromkeys(URL_PATTERN.findall(text)))
+
+    async def has_valid_link(self, links: List[str]) -> bool:
+        """Check all links concurrently, returning as soon as one of them is valid."""
+        if not links:
+            return False
+
+        pending: set = {asyncio.ensure_future(self.is_valid(link)) for link in links}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if any(not task.cancelled() and task.exception() is None and task.result() for task in done):
+                    return True
+            return False
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def is_valid(self, link: str) -> Optional[bool]:
+        """Return the cached verdict for `link`, verifying it if needed."""
+        domain: str = urlsplit(link).netloc.lower()
+        if not domain or domain in self.dead_domains or domain in self.slow_domains:
+            return False
+        return await self.verdicts.get(link)
+
+    async def _verify(self, link: str) -> Optional[bool]:
+        """Send a HEAD request, falling back to a ranged GET for servers that refuse HEAD."""
+        domain: str = urlsplit(link).netloc.lower()
+        try:
+            async with self.http_client.head(
+                link, priority=Priority.BACKGROUND, allow_redirects=True, timeout=self.timeout
+            ) as response:
+                status: int = response.status
+
+            if status in HEAD_UNSUPPORTED:
+                headers: dict = {"Range": "bytes=0-0"}
+                async with self.http_client.get(
+                    link, priority=Priority.BACKGROUND, headers=headers, timeout=self.timeout
+                ) as response:
+                    status = response.status
+        except RateLimited as e:
+            logger.info(f"Link check skipped {link}: {e}")
+            return None
+        except (ClientConnectionError, asyncio.TimeoutError) as e:
+            logger.info(f"Link host unreachable {link}: {e!r}")
+            self._record_failure(domain, e)
+            return None
+        except Exception as e:
+            logger.error(f"Link check failed {link}: {e!r}")
+            return None
+
+        self.failures.pop(domain, None)
+        return 200 <= status < 300
+
+    def _record_failure(self, domain: str, error: Exception) -> None:
+        """Count a failed connection, skipping the host once it keeps failing or does not resolve."""
+        failures: int = self.failures.pop(domain, 0) + 1
+        if isinstance(getattr(error, "os_error", None), socket.gaierror):
+            self.dead_domains.add(domain)
+        elif failures >= FAILURES_BEFORE_DEAD:
+            (self.slow_domains if isinstance(error, asyncio.TimeoutError) else self.dead_domains).add(domain)
+        else:
+            self.failures[domain] = failures
+            if len(self.failures) > self.verdicts.maxsize:
+                self.failures.popitem(last=False)
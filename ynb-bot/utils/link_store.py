@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from json import load
+from pathlib import Path
+from typing import Dict, ItemsView, KeysView, Optional
+
+
+logger = logging.getLogger("bot." + __name__)
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS links (
+    username TEXT PRIMARY KEY,
+    discord_id INTEGER NOT NULL UNIQUE
+)
+"""
+
+# `PRAGMA user_version` once the legacy json file has been imported.
+MIGRATED_VERSION: int = 1
+
+
+class LinkStore:
+    """
+    Account links between a lowercase external username and a discord id, stored in SQLite.
+
+    Both directions are indexed in memory, so lookups never touch the disk.
+    Every write changes a single row in its own transaction, on a dedicated
+    thread so the event loop is never blocked.
+    """
+
+    def __init__(self, db_file: Path, legacy_json_file: Optional[Path] = None) -> None:
+        self.db_file = db_file
+        self.legacy_json_file = legacy_json_file
+
+        self.by_username: Dict[str, int] = {}
+        self.by_discord_id: Dict[int, str] = {}
+
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="link-store")
+        self._connection: sqlite3.Connection = self._executor.submit(self._open).result()
+
+    def _open(self) -> sqlite3.Connection:
+        """Open the database, import the legacy json file once and fill the indexes."""
+        connection: sqlite3.Connection = sqlite3.connect(str(self.db_file))
+        with connection:
+            connection.execute(SCHEMA)
+
+        version: int = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version < MIGRATED_VERSION:
+            self._migrate(connection)
+
+        for username, discord_id in connection.execute("SELECT username, discord_id FROM links"):
+            self.by_username[username] = discord_id
+            self.by_discord_id[discord_id] = username
+        logger.info(f"Loaded {len(self.by_username)} account links from {self.db_file}.")
+        return connection
+
+    def _migrate(self, connection: sqlite3.Connection) -> None:
+        """Import links from the legacy json file."""
+        data: dict = {}
+        if self.legacy_json_file is not None and self.legacy_json_file.exists():
+            with self.legacy_json_file.open() as f:
+                data = load(f)
+
+        with connection:
+            for username, discord_id in data.items():
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO links (username, discord_id) VALUES (?, ?)",
+                    (username.lower(), discord_id)
+                )
+                if cursor.rowcount == 0:
+                    logger.warning(f"Skipped duplicate link {username} - {discord_id} while migrating.")
+            connection.execute(f"PRAGMA user_version = {MIGRATED_VERSION}")
+        logger.info(f"Migrated {len(data)} account links from {self.legacy_json_file}.")
+
+    def get_discord_id(self, username: str) -> Optional[int]:
+        """Return the discord id linked with `username`."""
+        return self.by_username.get(username.lower())
+
+    def get_username(self, discord_id: int) -> Optional[str]:
+        """Return the username linked with `discord_id`."""
+        return self.by_discord_id.get(discord_id)
+
+    def usernames(self) -> KeysView:
+        return self.by_username.keys()
+
+    def items(self) -> ItemsView:
+        return self.by_username.items()
+
+    def __len__(self) -> int:
+        return len(self.by_username)
+
+    async def link(self, username: str, discord_id: int) -> bool:
+        """Link `username` with `discord_id`, return False if either is already linked."""
+        username = username.lower()
+        if username in self.by_username or discord_id in self.by_discord_id:
+            return False
+        self.by_username[username] = discord_id
+        self.by_discord_id[discord_id] = username
+        await self._write("INSERT INTO links (username, discord_id) VALUES (?, ?)", (username, discord_id))
+        return True
+
+    async def unlink(self, discord_id: int) -> Optional[str]:
+        """Remove the link of `discord_id`, returning the username it was linked with."""
+        username: Optional[str] = self.by_discord_id.pop(discord_id, None)
+        if username is None:
+            return None
+        del self.by_username[username]
+        await self._write("DELETE FROM links WHERE discord_id = ?", (discord_id,))
+        return username
+
+    async def _write(self, query: str, parameters: tuple) -> None:
+        def execute() -> None:
+            with self._connection:
+                self._connection.execute(query, parameters)
+
+        await asyncio.get_event_loop().run_in_executor(self._executor, execute)
+
+    def close(self) -> None:
+        """Finish pending writes and close the database."""
+        self._executor.submit(self._connection.close)
+        self._executor.shutdown(wait=True)
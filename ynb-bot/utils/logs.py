@@ -0,0 +1,77 @@
+import gzip
+import logging
+import os
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from queue import SimpleQueue
+from time import time
+
+
+# Defaults used when conf.json does not override them.
+DEFAULT_LOG_CONF: dict = {
+    "LOG_LEVEL": "DEBUG",
+    "LOG_MAX_BYTES": 5 * 1024 * 1024,  # rotate once the file is this large
+    "LOG_ROTATE_INTERVAL": 24 * 60 * 60,  # or this many seconds after it was opened
+    "LOG_BACKUP_COUNT": 10  # compressed files kept
+}
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    A file handler rotating on size or age, gzipping the rotated files.
+
+    Rotated files are named `<file>.1.gz` (newest) up to `<file>.<backup_count>.gz`,
+    older ones are deleted.
+    """
+
+    def __init__(self, filename: Path, max_bytes: int, interval: float, backup_count: int) -> None:
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.rollover_at: float = time() + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return time() >= self.rollover_at or bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time() + self.interval
+
+    def rotation_filename(self, default_name: str) -> str:
+        return default_name + ".gz"
+
+    def rotate(self, source: str, dest: str) -> None:
+        if not os.path.exists(source):
+            return
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def setup_logging(logger: logging.Logger, conf: dict, log_file: Path) -> QueueListener:
+    """
+    Send the records of `logger` through a queue to the console and a rotating file.
+
+    The handlers run on the listener's thread, so logging never writes to disk on
+    the event loop. The returned listener is started and must be stopped on exit
+    to flush the queue.
+    """
+    conf = {**DEFAULT_LOG_CONF, **conf}
+    formatter: logging.Formatter = logging.Formatter('{asctime} - {name} - {levelname} - {message}', style='{')
+
+    console_logging: logging.Handler = logging.StreamHandler()
+    console_logging.setFormatter(formatter)
+
+    log_file.parent.mkdir(exist_ok=True)
+    file_logging: logging.Handler = CompressingRotatingFileHandler(
+        log_file, conf["LOG_MAX_BYTES"], conf["LOG_ROTATE_INTERVAL"], conf["LOG_BACKUP_COUNT"]
+    )
+    file_logging.setFormatter(formatter)
+
+    queue: SimpleQueue = SimpleQueue()
+    logger.setLevel(conf["LOG_LEVEL"])
+    logger.addHandler(QueueHandler(queue))
+
+    listener: QueueListener = QueueListener(queue, console_logging, file_logging, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,94 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from discord import Member
+
+
+class MemberIndex:
+    """
+    Members of a guild sorted by join date, overall and per role.
+
+    Join date ranges, with or without a role filter, are answered with bisect
+    on the matching sorted list, so queries never scan the member list. The
+    index is kept current with `add`, `remove` and `update` from member events.
+    """
+
+    def __init__(self, members: Iterable[Member] = ()) -> None:
+        self._joined: List[Tuple[datetime, int]] = []
+        self._joined_at: Dict[int, datetime] = {}
+        self._roles: Dict[int, Set[int]] = {}
+        self.by_role: Dict[int, List[Tuple[datetime, int]]] = defaultdict(list)
+
+        for member in members:
+            if member.joined_at is None:
+                continue
+            entry: Tuple[datetime, int] = (member.joined_at, member.id)
+            self._joined.append(entry)
+            self._joined_at[member.id] = member.joined_at
+            self._roles[member.id] = {role.id for role in member.roles}
+            for role_id in self._roles[member.id]:
+                self.by_role[role_id].append(entry)
+
+        self._joined.sort()
+        for role_members in self.by_role.values():
+            role_members.sort()
+
+    def __len__(self) -> int:
+        return len(self._joined)
+
+    @staticmethod
+    def _delete(entries: List[Tuple[datetime, int]], entry: Tuple[datetime, int]) -> None:
+        position: int = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    def add(self, member: Member) -> None:
+        """Index a member who joined."""
+        if member.joined_at is None or member.id in self._joined_at:
+            return
+        entry: Tuple[datetime, int] = (member.joined_at, member.id)
+        insort(self._joined, entry)
+        self._joined_at[member.id] = member.joined_at
+        self._roles[member.id] = {role.id for role in member.roles}
+        for role_id in self._roles[member.id]:
+            insort(self.by_role[role_id], entry)
+
+    def remove(self, member_id: int) -> None:
+        """Drop a member who left."""
+        joined_at: Optional[datetime] = self._joined_at.pop(member_id, None)
+        if joined_at is None:
+            return
+        entry: Tuple[datetime, int] = (joined_at, member_id)
+        self._delete(self._joined, entry)
+        for role_id in self._roles.pop(member_id, ()):
+            self._delete(self.by_role[role_id], entry)
+
+    def update(self, member: Member) -> None:
+        """Reindex the roles of a member whose roles changed."""
+        if member.id not in self._joined_at:
+            self.add(member)
+            return
+        old_roles: Set[int] = self._roles.get(member.id, set())
+        new_roles: Set[int] = {role.id for role in member.roles}
+        if old_roles == new_roles:
+            return
+        entry: Tuple[datetime, int] = (self._joined_at[member.id], member.id)
+        for role_id in old_roles - new_roles:
+            self._delete(self.by_role[role_id], entry)
+        for role_id in new_roles - old_roles:
+            insort(self.by_role[role_id], entry)
+        self._roles[member.id] = new_roles
+
+    def joined_between(
+        self,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        role_id: Optional[int] = None
+    ) -> List[int]:
+        """Return ids of members who joined strictly after `after` and strictly before `before`, by join date."""
+        entries: List[Tuple[datetime, int]] = self._joined if role_id is None else self.by_role.get(role_id, [])
+        start: int = 0 if after is None else bisect_right(entries, (after, float("inf")))
+        end: int = len(entries) if before is None else bisect_left(entries, (before, -1))
+        return [member_id for _, member_id in entries[start:end]]
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from time import monotonic
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Upper bounds, in seconds, of the histogram buckets.
+DURATION_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+# Link checks reach arbitrary hosts, past this many the rest are counted as "other".
+MAX_HOSTS: int = 50
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and maximum."""
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0
+        self.max: float = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0
+
+    def quantile(self, q: float) -> float:
+        """Estimate the `q` quantile as the upper bound of the bucket holding it."""
+        rank: float = q * self.count
+        seen: int = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        """Format the histogram as Prometheus samples."""
+        prefix: str = f"{labels}," if labels else ""
+        lines: List[str] = []
+        cumulative: int = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix: str = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    In-process counters and timings of the bot.
+
+    Commands, outbound HTTP calls per host, gateway events, background jobs and
+    event loop lag are recorded here. They are read by the `.stats` command and
+    can be scraped in the Prometheus text format from a local HTTP endpoint.
+    """
+
+    def __init__(self) -> None:
+        self.started_at: float = monotonic()
+        self.commands: Dict[str, Histogram] = defaultdict(Histogram)
+        self.command_errors: Counter = Counter()
+        self.http: Dict[str, Histogram] = defaultdict(Histogram)
+        self.http_status: Counter = Counter()
+        self.gateway_events: Counter = Counter()
+        self.jobs: Dict[str, Histogram] = defaultdict(Histogram)
+        self.loop_lag: Histogram = Histogram(LAG_BUCKETS)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def uptime(self) -> float:
+        return monotonic() - self.started_at
+
+    def observe_command(self, name: str, duration: float, failed: bool) -> None:
+        self.commands[name].observe(duration)
+        if failed:
+            self.command_errors[name] += 1
+
+    def observe_http(self, host: str, status: str, duration: float) -> None:
+        if host not in self.http and len(self.http) >= MAX_HOSTS:
+            host = "other"
+        self.http[host].observe(duration)
+        self.http_status[host, status] += 1
+
+    def observe_event(self, event: str) -> None:
+        self.gateway_events[event] += 1
+
+    def observe_job(self, name: str, duration: float) -> None:
+        self.jobs[name].observe(duration)
+
+    async def sample_loop_lag(self, interval: float = 1) -> None:
+        """Measure how late the event loop wakes up from a sleep, forever."""
+        while True:
+            start: float = monotonic()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, monotonic() - start - interval))
+
+    def render(self) -> str:
+        """Format every metric in the Prometheus text format."""
+        lines: List[str] = [
+            "# TYPE ynb_uptime_seconds gauge",
+            f"ynb_uptime_seconds {self.uptime:.0f}",
+            "# TYPE ynb_command_duration_seconds histogram"
+        ]
+        for name, histogram in sorted(self.commands.items()):
+            lines += histogram.render("ynb_command_duration_seconds", f'command="{escape(name)}"')
+        lines.append("# TYPE ynb_command_errors_total counter")
+        for name, count in sorted(self.command_errors.items()):
+            lines.append(f'ynb_command_errors_total{{command="{escape(name)}"}} {count}')
+
+        lines.append("# TYPE ynb_http_request_duration_seconds histogram")
+        for host, histogram in sorted(self.http.items()):
+            lines += histogram.render("ynb_http_request_duration_seconds", f'host="{escape(host)}"')
+        lines.append("# TYPE ynb_http_responses_total counter")
+        for (host, status), count in sorted(self.http_status.items()):
+            lines.append(f'ynb_http_responses_total{{host="{escape(host)}",status="{escape(status)}"}} {count}')
+
+        lines.append("# TYPE ynb_gateway_events_total counter")
+        for event, count in sorted(self.gateway_events.items()):
+            lines.append(f'ynb_gateway_events_total{{event="{escape(event)}"}} {count}')
+
+        lines.append("# TYPE ynb_job_duration_seconds histogram")
+        for name, histogram in sorted(self.jobs.items()):
+            lines += histogram.render("ynb_job_duration_seconds", f'job="{escape(name)}"')
+
+        lines.append("# TYPE ynb_event_loop_lag_seconds histogram")
+        lines += self.loop_lag.render("ynb_event_loop_lag_seconds")
+        return "\n".join(lines) + "\n"
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start_server(self, host: str, port: int) -> None:
+        """Serve the metrics at http://host:port/metrics."""
+        app: web.Application = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Metrics served on http://{host}:{port}/metrics")
+
+    async def stop_server(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
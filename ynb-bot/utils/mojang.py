@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from .async_cache import AsyncTTLCache
+from .governor import RateLimited, parse_retry_after
+from .http import HTTPClient
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Mojang's bulk endpoint accepts at most this many names per request.
+NAMES_PER_REQUEST: int = 10
+
+# Mojang rejects a whole batch with 400 if any name in it breaks these rules.
+VALID_NAME: re.Pattern = re.compile(r"^[A-Za-z0-9_]{1,16}$")
+
+
+class MinecraftProfile(NamedTuple):
+    uuid: str
+    name: str
+
+
+class MojangProfiles:
+    """
+    Resolve Minecraft usernames to profiles through Mojang's bulk endpoint.
+
+    Results are cached by lowercase name, unknown names for `negative_ttl`
+    seconds only. Lookups that miss the cache wait up to `batch_delay` seconds
+    to be sent together, `NAMES_PER_REQUEST` names per request. Names that
+    cannot exist are answered locally, so they never fail a shared batch.
+    """
+
+    def __init__(
+        self,
+        http_client: HTTPClient,
+        url: str = "https://api.mojang.com/profiles/minecraft",
+        ttl: float = 24 * 60 * 60,
+        negative_ttl: float = 10 * 60,
+        batch_delay: float = 0.1
+    ) -> None:
+        self.http_client = http_client
+        self.url = url
+        self.batch_delay = batch_delay
+        self.cache: AsyncTTLCache = AsyncTTLCache(
+            self._enqueue, maxsize=4096, ttl=ttl, stale_ttl=0, negative_ttl=negative_ttl
+        )
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def lookup(self, name: str) -> Optional[MinecraftProfile]:
+        """Return the profile of a username, or `None` if it does not exist."""
+        if not VALID_NAME.match(name):
+            return None
+        return await self.cache.get(name.lower())
+
+    async def lookup_many(self, names: Iterable[str], return_exceptions: bool = False) -> Dict[str, Any]:
+        """
+        Look up several usernames at once, keyed by the names as given.
+
+        With `return_exceptions`, a failed lookup maps to its exception instead of raising.
+        """
+        names: List[str] = list(dict.fromkeys(names))
+        profiles: list = await asyncio.gather(
+            *(self.lookup(name) for name in names), return_exceptions=return_exceptions
+        )
+        return dict(zip(names, profiles))
+
+    async def _enqueue(self, name: str) -> Optional[MinecraftProfile]:
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        self._pending[name] = future
+        if len(self._pending) >= NAMES_PER_REQUEST:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(self.batch_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Send the pending names, in batches of `NAMES_PER_REQUEST`."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending: List[tuple] = list(self._pending.items())
+        self._pending = {}
+        for i in range(0, len(pending), NAMES_PER_REQUEST):
+            asyncio.ensure_future(self._request(dict(pending[i:i + NAMES_PER_REQUEST])))
+
+    async def _request(self, batch: Dict[str, asyncio.Future]) -> None:
+        try:
+            async with self.http_client.request("POST", self.url, json=list(batch)) as response:
+                if response.status == 429:
+                    raise RateLimited(response.url.host, parse_retry_after(response.headers.get("Retry-After")) or 60)
+                response.raise_for_status()
+                found: list = await response.json(content_type=None)
+        except Exception as e:
+            logger.error(f"Mojang profile lookup failed for {len(batch)} names: {e!r}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        profiles: Dict[str, MinecraftProfile] = {
+            profile["name"].lower(): MinecraftProfile(profile["id"], profile["name"]) for profile in found
+        }
+        for name, future in batch.items():
+            if not future.done():
+                future.set_result(profiles.get(name))
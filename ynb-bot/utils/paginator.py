@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from discord import Forbidden, HTTPException, Message, Reaction, User
+from discord.abc import Messageable
+from discord.ext.commands import Bot
+
+
+logger = logging.getLogger("bot." + __name__)
+
+FIRST: str = "\u23ee\ufe0f"
+PREVIOUS: str = "\u25c0\ufe0f"
+NEXT: str = "\u25b6\ufe0f"
+LAST: str = "\u23ed\ufe0f"
+STOP: str = "\u23f9\ufe0f"
+
+# Discord's message length limit, minus room for the code block and page footer.
+PAGE_CHARACTERS: int = 1900
+
+
+class LazyPaginator:
+    """
+    Browse rows a page at a time with reactions.
+
+    `rows` can be a sequence, which is sliced per page, or any iterable, which is
+    consumed only as far as the furthest page viewed. Only the page on screen is
+    formatted, with `format_row`. The paginator stops listening and forgets its
+    state once nobody has reacted for `timeout` seconds.
+
+    `start` returns as soon as the first page is sent. The reactions are handled
+    in a background task, so the command that started it finishes right away.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        rows: Iterable[Any],
+        format_row: Callable[[Any], str] = str,
+        per_page: int = 20,
+        timeout: float = 120,
+        empty_message: str = "Nothing found."
+    ) -> None:
+        self.title = title
+        self.format_row = format_row
+        self.per_page = per_page
+        self.timeout = timeout
+        self.empty_message = empty_message
+
+        self.index: int = 0
+        if isinstance(rows, Sequence):
+            self._rows: Sequence = rows
+            self._iterator: Optional[Iterator] = None
+        else:
+            self._rows = []
+            self._iterator = iter(rows)
+
+    @property
+    def page_count(self) -> Optional[int]:
+        """The number of pages, or None while an iterator has not been exhausted."""
+        if self._iterator is not None:
+            return None
+        return max(1, -(-len(self._rows) // self.per_page))
+
+    def _fetch_until(self, page: int) -> None:
+        """Consume the iterator far enough to fill `page`, plus one row to know whether another page follows."""
+        if self._iterator is None:
+            return
+        missing: int = (page + 1) * self.per_page + 1 - len(self._rows)
+        if missing > 0:
+            self._rows.extend(islice(self._iterator, missing))
+            if len(self._rows) < (page + 1) * self.per_page + 1:
+                self._iterator = None
+
+    def has_page(self, page: int) -> bool:
+        if page < 0:
+            return False
+        self._fetch_until(page)
+        return page * self.per_page < len(self._rows) or page == 0
+
+    def render(self, page: int) -> str:
+        """Format a single page."""
+        self._fetch_until(page)
+        rows: Sequence = self._rows[page * self.per_page:(page + 1) * self.per_page]
+        if not rows:
+            return f"```{self.empty_message}```"
+
+        page_count: Optional[int] = self.page_count
+        footer: str = f"Page {page + 1}/{page_count if page_count is not None else '?'}"
+        lines: List[str] = []
+        length: int = len(self.title) + len(footer)
+        for row in rows:
+            line: str = self.format_row(row)
+            if length + len(line) + 1 > PAGE_CHARACTERS:
+                lines.append("...")
+                break
+            lines.append(line)
+            length += len(line) + 1
+        body: str = "\n".join(lines)
+        return f"```{self.title}\n\n{body}\n\n{footer}```"
+
+    async def start(self, bot: Bot, destination: Messageable, author: User) -> Message:
+        """Send the first page and let `author` browse with reactions until the timeout."""
+        message: Message = await destination.send(self.render(0))
+        if self.has_page(1):
+            bot.loop.create_task(self.browse(bot, message, author))
+        return message
+
+    async def browse(self, bot: Bot, message: Message, author: User) -> None:
+        """Add the controls to `message` and turn pages on reactions until the timeout."""
+        controls: List[str] = [PREVIOUS, NEXT, STOP]
+        if self.page_count is not None and self.page_count > 2:
+            controls = [FIRST, PREVIOUS, NEXT, LAST, STOP]
+        for emoji in controls:
+            await message.add_reaction(emoji)
+
+        def check(reaction: Reaction, user: User) -> bool:
+            return reaction.message.id == message.id and user.id == author.id and str(reaction.emoji) in controls
+
+        while True:
+            try:
+                reaction, user = await bot.wait_for("reaction_add", check=check, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                break
+
+            emoji: str = str(reaction.emoji)
+            if emoji == STOP:
+                break
+            target: int = {
+                FIRST: 0,
+                PREVIOUS: self.index - 1,
+                NEXT: self.index + 1,
+                LAST: (self.page_count or 1) - 1
+            }[emoji]
+
+            try:
+                await message.remove_reaction(reaction.emoji, user)
+            except (Forbidden, HTTPException):
+                pass
+
+            if target != self.index and self.has_page(target):
+                self.index = target
+                await message.edit(content=self.render(target))
+
+        try:
+            await message.clear_reactions()
+        except (Forbidden, HTTPException):
+            pass
+        # Drop the rows so an expired paginator holds no memory.
+        self._rows, self._iterator = [], None
@@ -0,0 +1,108 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from discord import HTTPException, Message, NotFound
+
+
+logger = logging.getLogger("bot." + __name__)
+
+
+class ReactionJob(NamedTuple):
+    priority: int
+    sequence: int
+    message: Message
+    emojis: list
+    enqueued_at: float
+
+
+class ReactionDispatcher:
+    """
+    Add reactions from a bounded queue worked by a pool of background tasks.
+
+    Newer messages are served first, and when the queue is full the oldest job is dropped.
+    Discord limits reactions to one per `interval` seconds per channel, so calls
+    are paced per channel instead of running into 429 responses.
+    """
+
+    def __init__(self, workers: int = 2, maxsize: int = 100, interval: float = 0.25) -> None:
+        self.workers = workers
+        self.maxsize = maxsize
+        self.interval = interval
+
+        self._heap: List[ReactionJob] = []
+        self._sequence = itertools.count()
+        self._available: asyncio.Semaphore = asyncio.Semaphore(0)
+        self._next_slot: Dict[int, float] = {}
+        self._tasks: List[asyncio.Task] = []
+
+        self.processed: int = 0
+        self.dropped: int = 0
+        self.latencies: Deque[float] = deque(maxlen=500)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the worker pool."""
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self) -> None:
+        """Cancel the worker pool, dropping queued jobs."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def submit(self, message: Message, emojis: list) -> None:
+        """Queue reactions for a message, shedding the oldest job if the queue is full."""
+        # Snowflakes grow with time, so the newest message has the smallest priority value.
+        job: ReactionJob = ReactionJob(-message.id, next(self._sequence), message, list(emojis), monotonic())
+        if len(self._heap) >= self.maxsize:
+            oldest: ReactionJob = max(self._heap)
+            if job > oldest:
+                self.dropped += 1
+                return
+            self._heap.remove(oldest)
+            heapq.heapify(self._heap)
+            self.dropped += 1
+            logger.warning(f"Reaction queue full, dropped reactions for message {oldest.message.id}.")
+        else:
+            self._available.release()
+        heapq.heappush(self._heap, job)
+
+    async def _worker(self) -> None:
+        while True:
+            await self._available.acquire()
+            job: ReactionJob = heapq.heappop(self._heap)
+            try:
+                for emoji in job.emojis:
+                    await self._wait_for_slot(job.message.channel.id)
+                    await job.message.add_reaction(emoji)
+            except NotFound:
+                # The message was deleted before all reactions were added.
+                continue
+            except HTTPException as e:
+                logger.error(f"Failed to add reactions to message {job.message.id}: {e}")
+                continue
+            self.processed += 1
+            self.latencies.append(monotonic() - job.enqueued_at)
+
+    async def _wait_for_slot(self, channel_id: int) -> None:
+        """Wait for the channel's next free slot in the reaction rate-limit bucket."""
+        now: float = monotonic()
+        slot: float = max(now, self._next_slot.get(channel_id, now))
+        self._next_slot[channel_id] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Return a percentile of recent end-to-end latencies in seconds."""
+        if not self.latencies:
+            return None
+        ordered: List[float] = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import datetime
+from json import load
+from pathlib import Path
+from time import monotonic
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from discord import HTTPException, Member, Message, Role, TextChannel
+
+from .file_writer import BackgroundWriter
+
+
+logger = logging.getLogger("bot." + __name__)
+
+
+class BulkRoleResult(NamedTuple):
+    assigned: List[str]
+    failed: List[str]
+    dry_run: bool
+
+
+class BulkRoleAssigner:
+    """
+    Give a role to many members concurrently.
+
+    Calls are capped at `concurrency` in flight and paced to one every `interval`
+    seconds, staying inside Discord's per-guild member-edit bucket. Progress is
+    shown by editing a single message, and the members already handled are saved
+    to `state_directory` so an interrupted job resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        state_directory: Path,
+        file_writer: BackgroundWriter,
+        concurrency: int = 5,
+        interval: float = 0.5,
+        progress_interval: float = 3
+    ) -> None:
+        self.state_directory = state_directory
+        self.file_writer = file_writer
+        self.concurrency = concurrency
+        self.interval = interval
+        self.progress_interval = progress_interval
+        self._next_slot: float = 0
+
+    @staticmethod
+    def eligible_members(
+        members: Iterable[Member],
+        required_role_ids: Set[int],
+        excluded_role_ids: Set[int],
+        joined_before: Optional[datetime] = None
+    ) -> List[Member]:
+        """Select members having all required roles, none of the excluded ones, who joined before a date."""
+        eligible: List[Member] = []
+        for member in members:
+            if joined_before is not None and (member.joined_at is None or member.joined_at >= joined_before):
+                continue
+            role_ids: Set[int] = {role.id for role in member.roles}
+            if required_role_ids <= role_ids and not excluded_role_ids & role_ids:
+                eligible.append(member)
+        return eligible
+
+    def _state_file(self, job_name: str) -> Path:
+        return self.state_directory / f"{job_name}.json"
+
+    def _load_state(self, job_name: str, role: Role) -> Dict[str, List[list]]:
+        state_file: Path = self._state_file(job_name)
+        if state_file.exists():
+            with state_file.open() as f:
+                state: dict = load(f)
+            if state.get("role_id") == role.id:
+                logger.info(f"Resuming role job {job_name} after {len(state['assigned'])} members.")
+                return state
+        return {"role_id": role.id, "assigned": [], "failed": []}
+
+    async def _save_state(self, job_name: str, state: dict) -> None:
+        # The workers keep appending to the lists, the writer gets copies.
+        await self.file_writer.write_json(
+            self._state_file(job_name),
+            {"role_id": state["role_id"], "assigned": list(state["assigned"]), "failed": list(state["failed"])}
+        )
+
+    def _clear_state(self, job_name: str) -> None:
+        state_file: Path = self._state_file(job_name)
+        if state_file.exists():
+            state_file.unlink()
+
+    async def _wait_for_slot(self) -> None:
+        now: float = monotonic()
+        slot: float = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def run(
+        self,
+        job_name: str,
+        role: Role,
+        members: List[Member],
+        progress_channel: TextChannel,
+        dry_run: bool = False,
+        reason: Optional[str] = None
+    ) -> BulkRoleResult:
+        """Give `role` to `members`, reporting progress in `progress_channel`."""
+        loop = asyncio.get_event_loop()
+        if dry_run:
+            return BulkRoleResult([str(member) for member in members], [], True)
+
+        state: dict = await loop.run_in_executor(None, self._load_state, job_name, role)
+        handled: Set[int] = {member_id for member_id, _ in state["assigned"] + state["failed"]}
+        pending: List[Member] = [member for member in members if member.id not in handled]
+        total: int = len(pending) + len(handled)
+
+        progress: Message = await progress_channel.send(f"```Giving {role.name}: {len(handled)}/{total}```")
+        queue: asyncio.Queue = asyncio.Queue()
+        for member in pending:
+            queue.put_nowait(member)
+
+        async def worker() -> None:
+            while not queue.empty():
+                member: Member = queue.get_nowait()
+                await self._wait_for_slot()
+                try:
+                    await member.add_roles(role, reason=reason)
+                except HTTPException as e:
+                    logger.error(f"Failed to give {role.name} to {member}: {e}")
+                    state["failed"].append([member.id, str(member)])
+                else:
+                    logger.info(f"{str(member)} is given the {role.name} role.")
+                    state["assigned"].append([member.id, str(member)])
+
+        async def report_progress() -> None:
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                done: int = len(state["assigned"]) + len(state["failed"])
+                await self._save_state(job_name, state)
+                await progress.edit(content=f"```Giving {role.name}: {done}/{total} ({len(state['failed'])} failed)```")
+
+        reporter: asyncio.Task = loop.create_task(report_progress())
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            reporter.cancel()
+            # Keep the state of an interrupted job so the next run resumes it.
+            await self._save_state(job_name, state)
+
+        await loop.run_in_executor(None, self._clear_state, job_name)
+        await progress.edit(
+            content=f"```Gave {role.name} to {len(state['assigned'])}/{total} members "
+                    f"({len(state['failed'])} failed).```"
+        )
+        return BulkRoleResult(
+            [name for _, name in state["assigned"]],
+            [name for _, name in state["failed"]],
+            False
+        )
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, time, timedelta
+from time import monotonic
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from .metrics import Metrics
+
+logger = logging.getLogger("bot." + __name__)
+
+# Wait this long after the first failure, doubling up to MAX_BACKOFF.
+MIN_BACKOFF: float = 5
+MAX_BACKOFF: float = 10 * 60
+
+# A service that stayed up this long is considered healthy again.
+HEALTHY_RUN: float = 60
+
+
+class Job:
+    """
+    A background job and its run statistics.
+
+    - `every`: run every `every` seconds, aligned to multiples of it on the UTC clock.
+    - `at`: run daily at these UTC times.
+    - neither: a long-running service, restarted whenever it stops.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        every: Optional[float] = None,
+        at: Sequence[time] = (),
+        jitter: float = 0
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.every = every
+        self.at: List[time] = sorted(at)
+        self.jitter = jitter
+
+        self.task: Optional[asyncio.Task] = None
+        self.next_run: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.runs: int = 0
+        self.failures: int = 0
+        self.consecutive_failures: int = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_service(self) -> bool:
+        return self.every is None and not self.at
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def next_slot(self, now: datetime) -> datetime:
+        """Return the next scheduled time after `now`, without jitter."""
+        if self.every is not None:
+            epoch: datetime = datetime(1970, 1, 1)
+            elapsed: float = (now - epoch).total_seconds()
+            return epoch + timedelta(seconds=(elapsed // self.every + 1) * self.every)
+
+        for at in self.at:
+            candidate: datetime = datetime.combine(now.date(), at)
+            if candidate > now:
+                return candidate
+        return datetime.combine(now.date() + timedelta(days=1), self.at[0])
+
+    def backoff(self) -> float:
+        return min(MIN_BACKOFF * 2 ** (self.consecutive_failures - 1), MAX_BACKOFF)
+
+
+class Scheduler:
+    """
+    Run background jobs on a wall-clock schedule.
+
+    Every job runs in its own supervised task. The next run is computed from the
+    schedule, never from the end of the previous run, so work time does not
+    accumulate as drift. A job never overlaps itself, a failing job is retried
+    with exponential backoff, and `stop` cancels everything on shutdown.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, metrics: Optional[Metrics] = None) -> None:
+        self.loop = loop
+        self.metrics = metrics
+        self.jobs: Dict[str, Job] = {}
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        every: Optional[float] = None,
+        at: Sequence[time] = (),
+        jitter: float = 0
+    ) -> Job:
+        """Schedule `func`, replacing any job with the same name."""
+        self.remove_job(name)
+        job: Job = Job(name, func, every, at, jitter)
+        job.task = self.loop.create_task(self._supervise(job) if job.is_service else self._run_schedule(job))
+        self.jobs[name] = job
+        logger.info(f"Job {name} scheduled.")
+        return job
+
+    def remove_job(self, name: str) -> None:
+        """Cancel and forget a job."""
+        job: Optional[Job] = self.jobs.pop(name, None)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+
+    def stop(self) -> None:
+        """Cancel every job."""
+        for name in list(self.jobs):
+            self.remove_job(name)
+
+    async def _run_once(self, job: Job) -> bool:
+        """Run the job once, recording its duration and outcome."""
+        start: float = monotonic()
+        try:
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.consecutive_failures += 1
+            job.last_error = repr(e)
+            logger.exception(f"Job {job.name} failed.")
+            return False
+        else:
+            job.consecutive_failures = 0
+            return True
+        finally:
+            job.runs += 1
+            job.last_duration = monotonic() - start
+            if self.metrics is not None:
+                self.metrics.observe_job(job.name, job.last_duration)
+
+    async def _run_schedule(self, job: Job) -> None:
+        while True:
+            now: datetime = datetime.utcnow()
+            if job.consecutive_failures:
+                retry: datetime = now + timedelta(seconds=job.backoff())
+                # Interval jobs skip slots until the backoff has passed, daily jobs retry
+                # instead of waiting for the next day.
+                job.next_run = job.next_slot(retry) if job.every is not None else retry
+            else:
+                job.next_run = job.next_slot(now) + timedelta(seconds=random.uniform(0, job.jitter))
+            await asyncio.sleep(max(0.0, (job.next_run - datetime.utcnow()).total_seconds()))
+            # Runs are awaited one after another, so a slow run delays the next
+            # slot instead of overlapping it.
+            await self._run_once(job)
+
+    async def _supervise(self, job: Job) -> None:
+        while True:
+            job.next_run = None
+            start: float = monotonic()
+            await self._run_once(job)
+            if monotonic() - start > HEALTHY_RUN:
+                job.consecutive_failures = 0
+            delay: float = job.backoff() if job.consecutive_failures else MIN_BACKOFF
+            job.next_run = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Service {job.name} stopped, restarting in {delay:.0f} seconds.")
+            await asyncio.sleep(delay)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+from time import monotonic
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("bot." + __name__)
+
+# Frames kept from the top of a captured stack.
+STACK_DEPTH: int = 12
+
+
+class Stall:
+    """The stalls seen at one code location, with the longest one's stack."""
+
+    def __init__(self, location: str, stack: str) -> None:
+        self.location = location
+        self.stack = stack
+        self.count: int = 0
+        self.total: float = 0
+        self.worst: float = 0
+
+    def add(self, duration: float, stack: str) -> None:
+        self.count += 1
+        self.total += duration
+        if duration >= self.worst:
+            self.worst = duration
+            self.stack = stack
+
+
+class LoopWatchdog:
+    """
+    Find what blocks the event loop.
+
+    A coroutine on the loop records a heartbeat several times per `threshold`.
+    A daemon thread watches the heartbeat and, when it is older than `threshold`,
+    captures the stack of the loop's thread while it is still blocked. Once the
+    loop runs again the stall is timed and grouped by the innermost frame of the
+    bot's own code, and `pop_report` returns the worst locations since the last
+    report.
+    """
+
+    def __init__(self, threshold: float = 0.25) -> None:
+        self.threshold = threshold
+        self.stalls: Dict[str, Stall] = {}
+        self._beat: float = monotonic()
+        self._captured: Optional[Tuple[float, str, str]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stopped: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start watching the loop of the calling thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = monotonic()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Loop watchdog started, threshold {self.threshold * 1000:.0f}ms.")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def heartbeat(self) -> None:
+        """Beat on the loop forever, timing the stalls captured by the watchdog thread."""
+        interval: float = self.threshold / 4
+        while True:
+            self._beat = monotonic()
+            await asyncio.sleep(interval)
+            captured = self._captured
+            if captured is not None and captured[0] == self._beat:
+                self._captured = None
+                duration: float = monotonic() - self._beat - interval
+                self._record(captured[1], captured[2], duration)
+
+    def _record(self, location: str, stack: str, duration: float) -> None:
+        stall: Optional[Stall] = self.stalls.get(location)
+        if stall is None:
+            stall = self.stalls[location] = Stall(location, stack)
+        stall.add(duration, stack)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 4):
+            beat: float = self._beat
+            if monotonic() - beat < self.threshold:
+                continue
+            if self._captured is not None and self._captured[0] == beat:
+                continue
+            frame: Optional[FrameType] = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._captured = (beat, *self._describe(frame))
+
+    @staticmethod
+    def _describe(frame: FrameType) -> Tuple[str, str]:
+        """Return the location to blame for a stack, and the stack itself."""
+        summary: traceback.StackSummary = traceback.extract_stack(frame)
+        blamed = summary[-1]
+        for entry in reversed(summary):
+            if "ynb-bot" in entry.filename:
+                blamed = entry
+                break
+        location: str = f"{blamed.filename.rsplit('ynb-bot', 1)[-1].lstrip('/')}:{blamed.lineno} in {blamed.name}"
+        stack: str = "".join(traceback.format_list(summary[-STACK_DEPTH:]))
+        return location, stack
+
+    def pop_report(self, limit: int = 3) -> List[Stall]:
+        """Return the locations with the longest stalls since the last report, and forget them."""
+        worst: List[Stall] = sorted(self.stalls.values(), key=lambda stall: -stall.worst)[:limit]
+        self.stalls = {}
+        return worst